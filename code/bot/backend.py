@@ -0,0 +1,74 @@
+# The cache manager and search engine that serve the bot
+from contextlib import contextmanager
+from threading import Lock
+
+
+class SearchBackend:
+    """
+    The cache manager and the search engine that serve the bot, kept together so they are swapped in a single
+    reference and a request never mixes the ones of two different loads.
+
+    Each backend has a generation, the order in which its load started, so a slow load never replaces a newer one.
+    The requests hold the backend while they use it (see use), and once it is retired (see retire) its engine is
+    closed when the last of them finishes.
+    """
+    def __init__(self, cache_manager, search_engine, generation=0):
+        """
+        Args:
+            cache_manager (CacheManager): The cache manager.
+            search_engine (SearchEngine): The search engine over the definitions of the cache manager.
+            generation (int, optional): The order in which its load started.
+        """
+        self.cache_manager = cache_manager
+        self.search_engine = search_engine
+        self.generation = generation
+        self._users = 0
+        self._retired = False
+        self._lock = Lock()
+
+    def acquire(self):
+        """
+        Returns:
+            bool: If the backend can be used, that is, it is not retired.
+        """
+        with self._lock:
+            if self._retired:
+                return False
+            self._users += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self._users -= 1
+            closing = self._retired and self._users == 0
+        if closing:
+            self.search_engine.close()
+
+    def retire(self):
+        # The engine is closed now, or when the last request that holds it finishes.
+        with self._lock:
+            self._retired = True
+            closing = self._users == 0
+        if closing:
+            self.search_engine.close()
+
+
+@contextmanager
+def use(get_backend):
+    """
+    It holds the current backend during a request, so it is not closed meanwhile even if another one
+    is swapped in.
+
+    Args:
+        get_backend (callable): It returns the current backend.
+
+    Yields:
+        SearchBackend: The backend held.
+    """
+    # A retired backend was already replaced, so the next read gets the new one.
+    while not (backend := get_backend()).acquire():
+        pass
+    try:
+        yield backend
+    finally:
+        backend.release()
@@ -12,5 +12,21 @@ ADMIN = []
 # Sleep time for the main Thread of the bot (in seconds)
 SLEEP_TIME = 30
 
+# Number of inverse search results ordered by relevance, from the most to the least relevant.
+# The rest of the results follow them unranked, so all of them can still be browsed.
+SEARCH_RESULTS_LIMIT = 50
+
+# Maximum number of suggestions answered to an inline query
+# Note that the inline mode must be enabled for the bot via @BotFather
+INLINE_RESULTS_LIMIT = 10
+
+# Serve the searches from the SQLite database (built with `make database`) instead of the JSON files in memory
+USE_DATABASE = False
+
+# Load the definitions of each letter only when they are needed, keeping at most MAX_RESIDENT_LETTERS in memory
+# (None for no limit). The searches are slower, but the bot starts instantly with a small footprint.
+LAZY_LOADING = False
+MAX_RESIDENT_LETTERS = None
+
 # Bot config save file for persistence
 BOT_CONFIG_FILE = f"{DATA_DIR}/bot_settings.json"
@@ -8,6 +8,10 @@ from code.bot.bot_config import TOKEN
 USAGE = "USAGE:\tpython[3] bot.py [-t TOKEN] [-p PROXY_SERVER]"
 PARSING_SCHEME = "p:t:"
 
+# The maximum length of a Telegram message
+MESSAGE_MAX_LENGTH = 4096
+ELLIPSIS = "…"
+
 
 def parse_options(arguments):
     """
@@ -54,3 +58,25 @@ def inline_keyboard(*args):
             keyboard_row.append(InlineKeyboardButton(text=name, callback_data=data))
         keyboard.append(keyboard_row)
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
+
+
+def truncate_message(text, max_length=MESSAGE_MAX_LENGTH):
+    """
+    This function cuts a message that does not fit in a Telegram message. The cut is done at the end of a line,
+    so the HTML tags of the formatted definitions are kept closed, and it is marked with an ellipsis.
+
+    Args:
+        text (str): The message.
+        max_length (int, optional): The maximum length of the message.
+
+    Returns:
+        str: The message, cut if it is longer than max_length.
+    """
+    if len(text) <= max_length:
+        return text
+
+    end = text.rfind("\n", 0, max_length - len(ELLIPSIS))
+    if end == -1:
+        # A single line is cut anywhere.
+        return text[:max_length - len(ELLIPSIS)] + ELLIPSIS
+    return text[:end + 1] + ELLIPSIS
@@ -1,7 +1,12 @@
 # RAE API
 import json
+from time import perf_counter, sleep
 
-from requests import request
+from requests import Session
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, Timeout
+
+from code.config import DICT_API_URL, WORDS_API_URL
 
 
 class APIException(Exception):
@@ -17,29 +22,79 @@ class APIException(Exception):
 
 
 class API:
-    def __init__(self):
+    """
+    The requests are made through a shared keep-alive session, so they reuse the connections.
+    Optionally, they can be throttled by a rate limiter shared among all the threads (e.g. a TokenBucket).
+
+    The timeouts, the connection errors and the 5xx and 429 responses are retried with exponential backoff:
+    'backoff' seconds before the first retry, doubled for each new one.
+
+    If 'on_request' is given, it is called after every attempt with the url, the status code (None if the request
+    failed), the latency in seconds, the size of the response in bytes and whether the attempt was a retry.
+    """
+    MAX_RETRIES = 4
+    BACKOFF = 0.5
+    TIMEOUT = 10
+    POOL_SIZE = 10
+
+    def __init__(self, rate_limiter=None, max_retries=None, backoff=None, timeout=None, pool_size=None,
+                 on_request=None):
         self.auth_token = None
+        self.rate_limiter = rate_limiter
+        self.on_request = on_request
+        self.max_retries = max_retries if max_retries is not None else self.MAX_RETRIES
+        self.backoff = backoff if backoff is not None else self.BACKOFF
+        self.timeout = timeout if timeout is not None else self.TIMEOUT
+
+        adapter = HTTPAdapter(pool_maxsize=pool_size if pool_size is not None else self.POOL_SIZE)
+        self.session = Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
 
     @staticmethod
     def _prepare_response(response):
         response.encoding = "utf-8"
         return response.text
 
+    @staticmethod
+    def _is_retryable(status_code):
+        return status_code >= 500 or status_code == 429
+
+    def _notify(self, url, status_code, latency, size, retry):
+        if self.on_request is not None:
+            self.on_request(url, status_code, latency, size, retry)
+
     def _request(self, url, params):
         headers = {"Authorization": f"Basic {self.auth_token}"} if self.auth_token else dict()
-        try:
-            response = request("get", url, params=params, headers=headers)
-        except Exception as e:
-            raise APIException(500, f"Something went wrong when doing the request.\n{e}")
-        return response.status_code, API._prepare_response(response)
+        for attempt in range(self.max_retries + 1):
+            if attempt > 0:
+                sleep(self.backoff * 2 ** (attempt - 1))
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+
+            start_time = perf_counter()
+            try:
+                response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+            except (ConnectionError, Timeout) as e:
+                self._notify(url, None, perf_counter() - start_time, 0, attempt > 0)
+                if attempt == self.max_retries:
+                    raise APIException(500, f"Something went wrong when doing the request.\n{e}")
+                continue
+            except Exception as e:
+                raise APIException(500, f"Something went wrong when doing the request.\n{e}")
+
+            self._notify(url, response.status_code, perf_counter() - start_time, len(response.content), attempt > 0)
+            if not self._is_retryable(response.status_code) or attempt == self.max_retries:
+                return response.status_code, API._prepare_response(response)
 
 
 class WordsAPI(API):
     LETTERS = "ABCDEFGHIJKLMNÑOPQRSTUVWXYZ"
 
-    def __init__(self):
-        super(WordsAPI, self).__init__()
-        self.url = "https://www.listapalabras.com/palabras-con.php"
+    def __init__(self, base_url=None, **kwargs):
+        super(WordsAPI, self).__init__(**kwargs)
+        self.base_url = base_url if base_url is not None else WORDS_API_URL
+        self.url = f"{self.base_url}/palabras-con.php"
 
     def get_words(self, letter):
         """
@@ -68,9 +123,9 @@ class WordsAPI(API):
 
 
 class DictAPI(API):
-    def __init__(self):
-        super(DictAPI, self).__init__()
-        self.base_url = "https://dle.rae.es/data"
+    def __init__(self, base_url=None, **kwargs):
+        super(DictAPI, self).__init__(**kwargs)
+        self.base_url = base_url if base_url is not None else DICT_API_URL
         self.search_url = f"{self.base_url}/search"
         self.fetch_url = f"{self.base_url}/fetch"
 
@@ -1,24 +1,45 @@
 # Cache Reload as Script
 import sys
+from code.cache_manager.database import Database
 from code.cache_manager.manager import CacheManager
+from code.config import DB_FILE, INDEX_FILE
+from code.search_engine.corpus import Corpus
+from code.search_engine.index_file import write_index_file
 
-USAGE = "USAGE:\tpython3 cache_manager [-w] [-d]"
+USAGE = "USAGE:\tpython3 cache_manager [-w] [-d] [-r] [-s] [-i]"
+OPTIONS = ("-w", "-d", "-r", "-s", "-i")
 
-if len(sys.argv[1:]) < 1 or len(sys.argv[1:]) > 2:
+if len(sys.argv[1:]) < 1 or len(sys.argv[1:]) > len(OPTIONS):
     print(USAGE)
 else:
     force_words_update = False
     force_definitions_update = False
+    refresh_definitions = False
+    export_database = False
+    build_index = False
 
     for arg in sys.argv[1:]:
-        if arg not in ("-w", "-d"):
+        if arg not in OPTIONS:
             print(USAGE)
             break
         else:
             if arg == "-w":
                 force_words_update = True
-            else:
+            elif arg == "-d":
                 force_definitions_update = True
+            elif arg == "-r":
+                refresh_definitions = True
+            elif arg == "-s":
+                export_database = True
+            else:
+                build_index = True
 
-    CacheManager().manage_cache(force_words_update=force_words_update,
-                                force_definitions_update=force_definitions_update)
+    cache_manager = CacheManager()
+    cache_manager.manage_cache(force_words_update=force_words_update,
+                               force_definitions_update=force_definitions_update)
+    if refresh_definitions:
+        cache_manager.refresh_definitions()
+    if export_database:
+        Database(DB_FILE).import_data(cache_manager.words, cache_manager.definitions)
+    if build_index:
+        write_index_file(Corpus(cache_manager.definitions), INDEX_FILE)
@@ -0,0 +1,326 @@
+# SQLite storage
+import re
+import sqlite3
+from functools import lru_cache
+from itertools import groupby
+from operator import itemgetter
+from threading import Lock
+
+from code.search_engine.query import AND, NOT, OR, PHRASE, TERM
+from code.utils import Formatter
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS words (
+    id INTEGER PRIMARY KEY,
+    letter TEXT NOT NULL,
+    word TEXT NOT NULL UNIQUE,
+    flattened_word TEXT NOT NULL,
+    fetched INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS words_letter ON words(letter, fetched);
+CREATE INDEX IF NOT EXISTS words_flattened ON words(flattened_word);
+
+CREATE TABLE IF NOT EXISTS definitions (
+    id INTEGER PRIMARY KEY,
+    word_id INTEGER NOT NULL REFERENCES words(id),
+    position INTEGER NOT NULL,
+    definition TEXT NOT NULL,
+    flattened_definition TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS definitions_word ON definitions(word_id, position);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS definitions_fts USING fts5(
+    flattened_definition, content='definitions', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS definitions_insert AFTER INSERT ON definitions BEGIN
+    INSERT INTO definitions_fts(rowid, flattened_definition) VALUES (new.id, new.flattened_definition);
+END;
+CREATE TRIGGER IF NOT EXISTS definitions_delete AFTER DELETE ON definitions BEGIN
+    INSERT INTO definitions_fts(definitions_fts, rowid, flattened_definition)
+    VALUES ('delete', old.id, old.flattened_definition);
+END;
+"""
+
+# The trigram tokenizer can only match terms of 3 characters or more.
+MIN_FTS_TERM_LENGTH = 3
+
+
+@lru_cache(maxsize=64)
+def _compile_pattern(pattern):
+    return re.compile(pattern, re.MULTILINE)
+
+
+def _regexp(pattern, text):
+    # The REGEXP operator of SQLite: 'text REGEXP pattern' calls regexp(pattern, text).
+    return _compile_pattern(pattern).search(text) is not None
+
+
+def _query_tree_sql(tree):
+    # The condition over a definition of a query tree (see search_engine.query), with its parameters.
+    kind, value = tree
+    if kind in (TERM, PHRASE):
+        return "instr(d.flattened_definition, ?) > 0", [value]
+    if kind == NOT:
+        condition, parameters = _query_tree_sql(value)
+        return f"NOT ({condition})", parameters
+    if not value:
+        # An empty query matches everything.
+        return "1", list()
+    children = list(_query_tree_sql(child) for child in value)
+    operator = " AND " if kind == AND else " OR "
+    return (
+        operator.join(f"({condition})" for condition, _ in children),
+        list(parameter for _, parameters in children for parameter in parameters)
+    )
+
+
+def _required_terms(tree):
+    # The terms and phrases that every definition matching the query tree contains.
+    kind, value = tree
+    if kind in (TERM, PHRASE):
+        return {value}
+    if kind == AND:
+        return set().union(*(_required_terms(child) for child in value))
+    if kind == OR:
+        return set.intersection(*(_required_terms(child) for child in value))
+    return set()
+
+
+class Database:
+    """
+    The SQLite storage of the words and definitions, with a FTS5 trigram index over the flattened definitions,
+    so the inverse search keeps the substring semantics without loading the dictionary in memory.
+
+    Every letter is written in its own transaction, so an interrupted write never leaves a letter half stored.
+    The searches read the matching words together with all their definitions in a single query.
+    """
+    def __init__(self, database_file):
+        self.database_file = database_file
+        self.connection = sqlite3.connect(database_file, check_same_thread=False)
+        self.connection.create_function("regexp", 2, _regexp, deterministic=True)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+        self._lock = Lock()
+
+    def _query(self, sql, parameters=()):
+        with self._lock:
+            return self.connection.execute(sql, parameters).fetchall()
+
+    def close(self):
+        # The queries in progress finish first.
+        with self._lock:
+            self.connection.close()
+
+    # Writers
+    def save_words(self, words):
+        """
+        Args:
+            words (dict): All the words indexed by first letter.
+        """
+        with self._lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO words(letter, word, flattened_word) VALUES (?, ?, ?)",
+                ((letter, word, Formatter.flatten_text(word)) for letter, letter_words in words.items()
+                 for word in letter_words)
+            )
+
+    def save_letter(self, letter, letter_definitions):
+        """
+        It replaces all the definitions of the words of a letter.
+
+        Args:
+            letter (str): The letter of the words.
+            letter_definitions (dict): The definitions list indexed by word.
+        """
+        with self._lock, self.connection:
+            self.connection.execute(
+                "DELETE FROM definitions WHERE word_id IN (SELECT id FROM words WHERE letter = ?)", (letter,)
+            )
+            self.connection.execute("UPDATE words SET fetched = 0 WHERE letter = ?", (letter,))
+            for word, definitions in letter_definitions.items():
+                self.connection.execute(
+                    "INSERT INTO words(letter, word, flattened_word, fetched) VALUES (?, ?, ?, 1) "
+                    "ON CONFLICT(word) DO UPDATE SET fetched = 1",
+                    (letter, word, Formatter.flatten_text(word))
+                )
+                word_id = self.connection.execute("SELECT id FROM words WHERE word = ?", (word,)).fetchone()[0]
+                self.connection.executemany(
+                    "INSERT INTO definitions(word_id, position, definition, flattened_definition) VALUES (?, ?, ?, ?)",
+                    ((word_id, position, definition, Formatter.flatten_text(definition))
+                     for position, definition in enumerate(definitions))
+                )
+
+    def import_data(self, words, definitions):
+        """
+        It stores all the words and definitions, letter by letter.
+
+        Args:
+            words (dict): All the words indexed by first letter.
+            definitions (Mapping): All the definitions indexed by word's first letter and word.
+        """
+        self.save_words(words)
+        for letter, letter_definitions in definitions.items():
+            self.save_letter(letter, letter_definitions)
+
+    # Readers
+    def words(self):
+        """
+        Returns:
+            dict: All the words indexed by first letter.
+        """
+        words = dict()
+        for letter, word in self._query("SELECT letter, word FROM words ORDER BY id"):
+            words.setdefault(letter, list()).append(word)
+        return words
+
+    def definitions_of(self, word):
+        """
+        Returns:
+            list: The definitions of the word.
+
+        Raises:
+            KeyError: If the word definitions are not stored.
+        """
+        rows = self._query(
+            "SELECT d.definition FROM words w LEFT JOIN definitions d ON d.word_id = w.id "
+            "WHERE w.word = ? AND w.fetched = 1 ORDER BY d.position",
+            (word,)
+        )
+        if not rows:
+            raise KeyError(word)
+        return list(definition for definition, in rows if definition is not None)
+
+    def words_like(self, flattened_word):
+        # The words that are equal ignoring accent marks and capital letters.
+        return list(word for word, in self._query(
+            "SELECT word FROM words WHERE flattened_word = ? AND fetched = 1 ORDER BY word", (flattened_word,)
+        ))
+
+    def complete(self, flattened_prefix, limit):
+        # The words that start with the prefix, ignoring accent marks and capital letters.
+        rows = self._query(
+            "SELECT word FROM words WHERE flattened_word >= ? AND flattened_word < ? AND fetched = 1 "
+            "ORDER BY flattened_word, word LIMIT ?",
+            (flattened_prefix, flattened_prefix + "\U0010ffff", limit)
+        )
+        return list(word for word, in rows)
+
+    @staticmethod
+    def _matching_definitions_sql(flattened_terms, condition=None, condition_parameters=()):
+        # The FROM and WHERE clauses of the definitions that contain all the terms and meet the condition.
+        terms = set(term for term in flattened_terms if term)
+        fts_terms = list(term for term in terms if len(term) >= MIN_FTS_TERM_LENGTH)
+        short_terms = list(term for term in terms if len(term) < MIN_FTS_TERM_LENGTH)
+
+        sql = "FROM definitions d JOIN words w ON w.id = d.word_id"
+        conditions = list()
+        parameters = list()
+        if fts_terms:
+            # The hidden rank column of FTS5 is the BM25 score of the definition (lower is better).
+            sql += (" JOIN (SELECT rowid, rank AS score FROM definitions_fts"
+                    " WHERE definitions_fts MATCH ?) f ON f.rowid = d.id")
+            parameters.append(" AND ".join('"' + term.replace('"', '""') + '"' for term in fts_terms))
+        for term in short_terms:
+            conditions.append("instr(d.flattened_definition, ?) > 0")
+            parameters.append(term)
+        if condition is not None:
+            conditions.append(f"({condition})")
+            parameters.extend(condition_parameters)
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        return sql, parameters, bool(fts_terms)
+
+    def _matching_words(self, sql, parameters, uses_fts, limit=None):
+        """
+        Args:
+            sql (str): The FROM and WHERE clauses of the matching definitions (see _matching_definitions_sql).
+            parameters (list): The parameters of the clauses.
+            uses_fts (bool): If the clauses join the FTS5 scores.
+            limit (int, optional): If provided, only the 'limit' best words are returned, ordered by the FTS5 BM25
+                                   score of their best definition. Ties are ordered alphabetically.
+                                   Else, all the words are returned in the dictionary order.
+
+        Returns:
+            list: The (word, definitions) of the words with a matching definition.
+        """
+        if limit is None:
+            matches = f"SELECT w.id AS id, w.word AS word, 0 AS score {sql} GROUP BY w.id"
+            order = "m.id"
+        else:
+            score = "MIN(f.score)" if uses_fts else "0"
+            matches = f"SELECT w.id AS id, w.word AS word, {score} AS score {sql} " \
+                      f"GROUP BY w.id ORDER BY score, w.word LIMIT ?"
+            parameters = parameters + [limit]
+            order = "m.score, m.word"
+
+        rows = self._query(
+            f"WITH m AS ({matches}) SELECT m.word, d.definition FROM m JOIN definitions d ON d.word_id = m.id "
+            f"ORDER BY {order}, d.position",
+            parameters
+        )
+        return list(
+            (word, list(definition for _, definition in word_rows)) for word, word_rows in groupby(rows, itemgetter(0))
+        )
+
+    def search(self, flattened_terms, limit=None):
+        """
+        Args:
+            flattened_terms (list): The flattened search terms.
+            limit (int, optional): If provided, only the 'limit' best words are returned (see _matching_words).
+
+        Returns:
+            list: The (word, definitions) of the words with a definition that contains all the terms,
+                  in the dictionary order.
+        """
+        return self._matching_words(*self._matching_definitions_sql(flattened_terms), limit=limit)
+
+    def advanced_search(self, query_tree, limit=None):
+        """
+        Args:
+            query_tree (tuple): The parsed query (see search_engine.query.parse_query).
+            limit (int, optional): If provided, only the 'limit' best words are returned (see _matching_words).
+
+        Returns:
+            list: The (word, definitions) of the words with a definition that matches the query,
+                  in the dictionary order.
+        """
+        # The terms that every match contains narrow the query down with the FTS index.
+        condition, condition_parameters = _query_tree_sql(query_tree)
+        return self._matching_words(
+            *self._matching_definitions_sql(_required_terms(query_tree), condition, condition_parameters), limit=limit
+        )
+
+    def pattern_search(self, pattern):
+        """
+        Args:
+            pattern (str): The regular expression, matched in MULTILINE mode against each flattened definition.
+
+        Returns:
+            list: The (word, definitions) of the words with a definition that matches the pattern,
+                  in the dictionary order.
+
+        Raises:
+            re.error: If the pattern is not a valid regular expression.
+        """
+        _compile_pattern(pattern)
+        return self._matching_words(*self._matching_definitions_sql((), "d.flattened_definition REGEXP ?", [pattern]))
+
+    # Statistics
+    def number_of_words(self, letter=None):
+        if letter is None:
+            return self._query("SELECT COUNT(*) FROM words WHERE fetched = 1")[0][0]
+        return self._query("SELECT COUNT(*) FROM words WHERE fetched = 1 AND letter = ?", (letter,))[0][0]
+
+    def number_of_definitions(self, letter=None):
+        if letter is None:
+            return self._query("SELECT COUNT(*) FROM definitions")[0][0]
+        return self._query(
+            "SELECT COUNT(*) FROM definitions d JOIN words w ON w.id = d.word_id WHERE w.letter = ?", (letter,)
+        )[0][0]
+
+    def max_words_letter(self):
+        # None if no word was fetched yet, like StatisticsManifest.max_words_letter.
+        rows = self._query(
+            "SELECT letter FROM words WHERE fetched = 1 GROUP BY letter ORDER BY COUNT(*) DESC LIMIT 1"
+        )
+        return rows[0][0] if rows else None
@@ -0,0 +1,173 @@
+# Local stand-in of the listapalabras and RAE APIs
+import json
+import random
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from time import monotonic, sleep
+from urllib.parse import parse_qs, urlparse
+
+
+def record_from_cache(words, definitions):
+    """
+    It builds the responses of the APIs for the cached words and definitions, in the same format as the real ones,
+    so the parsers get back the cached data.
+
+    Args:
+        words (dict): The words indexed by letter.
+        definitions (dict): The definitions indexed by letter and word (the words without them are not found).
+
+    Returns:
+        dict: The recorded responses (see FakeServer).
+    """
+    recordings = {"words": dict(), "search": dict(), "fetch": dict()}
+    for letter, letter_words in words.items():
+        links = "".join(f'<a href="/palabra/{escape(word)}">{escape(word)}</a>' for word in letter_words)
+        recordings["words"][letter.lower()] = f'<html><body><div id="columna_resultados_generales">{links}</div>' \
+                                              f'</body></html>'
+
+        letter_definitions = definitions.get(letter, dict())
+        for word in letter_words:
+            if not letter_definitions.get(word):
+                recordings["search"][word] = json.dumps({"approx": 0, "res": list()})
+                continue
+            word_id = f"{letter.lower()}{len(recordings['fetch'])}"
+            recordings["search"][word] = json.dumps({"approx": 0, "res": [{"header": word, "id": word_id}]})
+            # The parsers skip the first 3 characters of each definition: its number.
+            recordings["fetch"][word_id] = "".join(
+                f'<p class="j"><span class="n_acep">1. </span>{escape(definition)}</p>'
+                for definition in letter_definitions[word]
+            )
+    return recordings
+
+
+class _FakeRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # The headers and the body are written apart, so Nagle's algorithm would delay the body.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        status_code, body, content_type = self.server.fake_server.answer(self.path)
+        body = body.encode("utf-8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeServer:
+    """
+    A local HTTP server that replays the recorded responses of the APIs, to measure the crawler without
+    touching the real sites. The recordings (see record_from_cache) are indexed by endpoint:
+        - "words": the listapalabras page of each letter, for /palabras-con.php?letra={letter}.
+        - "search": the RAE search JSON of each word, for /data/search?w={word}.
+        - "fetch": the RAE definitions HTML of each word id, for /data/fetch?id={id}.
+
+    Each request is answered after 'latency' seconds, plus up to 'jitter' random seconds. A fraction 'error_rate'
+    of the requests fail with 503, and the requests over 'max_rate' per second are throttled with 429.
+
+    The WordsAPI and DictAPI are pointed at it through 'words_api_url' and 'dict_api_url'.
+    """
+    def __init__(self, recordings, latency=0.05, jitter=0.0, error_rate=0.0, max_rate=None, port=0):
+        """
+        Args:
+            recordings (dict): The responses of each endpoint.
+            latency (float, optional): The minimum time to answer a request, in seconds.
+            jitter (float, optional): The maximum random time added to the latency, in seconds.
+            error_rate (float, optional): The fraction of requests answered with 503.
+            max_rate (int, optional): The maximum number of requests per second. By default, there is no limit.
+            port (int, optional): The port to listen to. By default, any free one.
+        """
+        self.recordings = recordings
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.max_rate = max_rate
+
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+        self._lock = Lock()
+        self._window_start = monotonic()
+        self._window_requests = 0
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _FakeRequestHandler)
+        self._server.daemon_threads = True
+        self._server.fake_server = self
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    @property
+    def words_api_url(self):
+        return self.url
+
+    @property
+    def dict_api_url(self):
+        return f"{self.url}/data"
+
+    def start(self):
+        self._thread = Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _is_throttled(self):
+        # A fixed window of one second.
+        with self._lock:
+            self.requests += 1
+            if self.max_rate is None:
+                return False
+            now = monotonic()
+            if now - self._window_start >= 1:
+                self._window_start = now
+                self._window_requests = 0
+            self._window_requests += 1
+            if self._window_requests > self.max_rate:
+                self.throttled += 1
+                return True
+            return False
+
+    def answer(self, path):
+        """
+        Args:
+            path (str): The requested path, with its query.
+
+        Returns:
+            tuple: The status code, the body and the content type of the response.
+        """
+        if self._is_throttled():
+            return 429, "Too Many Requests", "text/plain"
+        sleep(self.latency + random.uniform(0, self.jitter))
+        if random.random() < self.error_rate:
+            with self._lock:
+                self.errors += 1
+            return 503, "Service Unavailable", "text/plain"
+
+        url = urlparse(path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if url.path == "/palabras-con.php" and query.get("letra") in self.recordings["words"]:
+            return 200, self.recordings["words"][query["letra"]], "text/html; charset=utf-8"
+        if url.path == "/data/search" and "w" in query:
+            # The RAE answers the unknown words with an empty search.
+            default_search = json.dumps({"approx": 0, "res": list()})
+            return 200, self.recordings["search"].get(query["w"], default_search), "application/json"
+        if url.path == "/data/fetch" and query.get("id") in self.recordings["fetch"]:
+            return 200, self.recordings["fetch"][query["id"]], "text/html; charset=utf-8"
+        return 404, "Not Found", "text/plain"
@@ -0,0 +1,75 @@
+import json
+import os
+
+from code.config import DEFS_DIR
+from code.utils import save_data
+
+
+class DefinitionsJournal:
+    """
+    An append-only JSON lines file, '{letter}.jsonl' under the DEFS_DIR directory, with the parsed definitions
+    of each word of a letter, written as soon as they are fetched. If the fetch of a letter stops halfway,
+    the next one resumes from the journal instead of starting over.
+
+    Once the letter is done, the journal is compacted into the '{letter}.json' file and removed.
+    """
+    def __init__(self, letter):
+        self.letter = letter
+        self.journal_file = f"{DEFS_DIR}/{letter}.jsonl"
+        self.letter_file = f"{DEFS_DIR}/{letter}.json"
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.journal_file, "a", encoding="utf-8")
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._file.close()
+        self._file = None
+
+    def load(self):
+        """
+        It reads the words already journaled. A last line cut by a crash is discarded and removed from the file,
+        so the next entries are appended after the last complete one.
+
+        Returns:
+            dict: The definition list of each journaled word, in the order they were fetched.
+        """
+        letter_definitions = dict()
+        if not os.path.exists(self.journal_file):
+            return letter_definitions
+
+        valid_length = 0
+        with open(self.journal_file, "rb") as journal:
+            for line in journal:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    entry = json.loads(line)
+                    letter_definitions[entry["word"]] = entry["definitions"]
+                except (ValueError, KeyError, TypeError):
+                    break
+                valid_length += len(line)
+
+        if valid_length < os.path.getsize(self.journal_file):
+            with open(self.journal_file, "r+b") as journal:
+                journal.truncate(valid_length)
+        return letter_definitions
+
+    def append(self, word, definitions):
+        self._file.write(json.dumps({"word": word, "definitions": definitions}, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def compact(self, letter_definitions):
+        """
+        It writes all the definitions of the letter into its json file, replacing it atomically, and removes
+        the journal.
+
+        Args:
+            letter_definitions (dict): All the definition lists of the letter, indexed by word.
+        """
+        temporary_file = f"{self.letter_file}.tmp"
+        save_data(temporary_file, letter_definitions)
+        os.replace(temporary_file, self.letter_file)
+        if os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
@@ -0,0 +1,51 @@
+from collections.abc import Mapping
+
+from code.config import DEFS_DIR
+from code.utils import Formatter, LRUCache, load_data
+
+
+class LazyDefinitions(Mapping):
+    """
+    The definitions as a read-only mapping {letter: {word: definitions}}, like the data loaded from the json files,
+    that only loads the json file of a letter the first time that letter is accessed.
+
+    With a maximum number of resident letters, the least recently used letter is evicted when a new one is loaded,
+    so iterating over all the letters streams them one by one within a bounded memory.
+    """
+    def __init__(self, letters, max_letters=None):
+        """
+        Args:
+            letters (iterable): The letters with a json file under the DEFS_DIR directory.
+            max_letters (int, optional): The maximum number of letters kept in memory. Unbounded by default.
+        """
+        self.letters = list(letters)
+        self.max_letters = max_letters
+        self._resident_letters = LRUCache(max_letters if max_letters is not None else len(self.letters))
+
+    @staticmethod
+    def letter_of(word):
+        """
+        Returns:
+            str: The letter under which the word is stored, ignoring its accent marks.
+        """
+        return Formatter.flatten_text(word[:1]).upper()
+
+    def __getitem__(self, letter):
+        if letter not in self.letters:
+            raise KeyError(letter)
+        if (definitions := self._resident_letters.get(letter)) is None:
+            definitions = load_data(f"{DEFS_DIR}/{letter}.json")
+            if definitions is None:
+                # The file could not be loaded (the error is logged), so it is loaded again the next time.
+                raise KeyError(letter)
+            self._resident_letters.put(letter, definitions)
+        return definitions
+
+    def __iter__(self):
+        return iter(self.letters)
+
+    def __len__(self):
+        return len(self.letters)
+
+    def resident_letters(self):
+        return len(self._resident_letters)
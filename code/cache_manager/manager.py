@@ -1,10 +1,20 @@
 import os
+from datetime import datetime, timedelta, timezone
 from re import match
+from threading import Lock
 
 from code.cache_manager.API import WordsAPI, DictAPI
-from code.cache_manager.parser import parse_word, parse_definitions
+from code.cache_manager.journal import DefinitionsJournal
+from code.cache_manager.lazy_definitions import LazyDefinitions
+from code.cache_manager.pipeline import CrawlPipeline
+from code.cache_manager.rate_limiter import TokenBucket
+from code.cache_manager.statistics import StatisticsManifest
+from code.cache_manager.telemetry import CrawlTelemetry
+from code.cache_manager.parser import parse_word_lxml, parse_definitions_lxml
 from code.config import *
-from code.utils import log, load_data, save_data
+from code.search_engine.corpus import Corpus
+from code.search_engine.index_file import IndexFileError, MappedCorpus
+from code.utils import file_is_updated, log, load_data, save_data
 
 
 # Manager
@@ -14,15 +24,72 @@ class CacheManager:
     json files for persistence.
 
     It can load the content of that file to have a faster startup.
+
+    In compact mode, the definitions are held as a Corpus, which can be shared with the SearchEngine
+    so the process only holds one (compact) copy of them. If the index file (built with write_index_file)
+    is up to date, the Corpus is mapped from it instead of loading the json files.
+
+    With a database (see cache_manager.database), the definitions are not held in memory: the statistics are
+    answered by the database and the fetched words and definitions are also written into it.
+
+    In lazy mode, the definitions are a LazyDefinitions mapping, that only loads the json file of a letter
+    when it is accessed, keeping at most 'max_letters' letters in memory.
+
+    The definitions are fetched by 'workers' concurrent threads, sharing the connections of the DictAPI session
+    and limited to 'rate_limit' requests per second (see config, 0 means no limit), and parsed in a pool of processes
+    (see cache_manager.pipeline). The APIs are reached at 'words_api_url' and 'dict_api_url' (by default, the ones
+    of the config), and 'on_request' is called after every request (see API).
+
+    The requests and the progress of each letter are recorded in the crawl telemetry (see cache_manager.telemetry),
+    which is reported in the TELEMETRY_FILE while crawling and summarized in the TELEMETRY_SUMMARY_FILE.
+
+    The statistics are kept in a manifest (see cache_manager.statistics) next to the definitions file,
+    that is updated every time a letter is fetched, so they are answered without walking the definitions.
+    It is loaded the first time a statistic is asked, so an outdated manifest does not delay the startup.
     """
     @staticmethod
     def _get_fetched_letters():
-        regex = r"(.)\.json"
+        regex = r"(.)\.json$"
         return set(z.groups()[0] for element in os.listdir(DEFS_DIR) if (z := match(regex, element)))
 
-    def __init__(self):
-        self.words = self._load_words(show_log=False)
-        self.definitions = self._load_definitions(show_log=False)
+    @staticmethod
+    def _definition_files():
+        # The letter files, the source of the rest of the definition files.
+        return list(f"{DEFS_DIR}/{element}" for element in os.listdir(DEFS_DIR))
+
+    def __init__(self, compact=False, database=None, lazy=False, max_letters=None, workers=None, rate_limit=None,
+                 words_api_url=None, dict_api_url=None, on_request=None):
+        self.compact = compact
+        self.database = database
+        self.lazy = lazy
+        self.max_letters = max_letters
+        self.workers = workers if workers is not None else CRAWL_WORKERS
+        self.rate_limit = rate_limit if rate_limit is not None else CRAWL_RATE_LIMIT
+        if self.rate_limit < 0:
+            raise Exception(f"Rate limit '{self.rate_limit}' not supported, it must be positive or 0 (no limit)")
+        self.words_api_url = words_api_url
+        self.dict_api_url = dict_api_url
+        self.on_request = on_request
+        self.telemetry = self._new_telemetry()
+        self._statistics = None
+        self._statistics_lock = Lock()
+        self.definitions = None
+        if database is not None:
+            self.words = database.words() or self._load_words(show_log=False)
+        else:
+            self.words = self._load_words(show_log=False)
+            self.definitions = self._load_definitions(show_log=False)
+
+    @property
+    def statistics(self):
+        """
+        StatisticsManifest: The statistics of the definitions, loaded the first time they are needed.
+        Without definitions (i.e. with a database), it is None.
+        """
+        with self._statistics_lock:
+            if self._statistics is None and self.definitions is not None:
+                self._statistics = self._load_statistics()
+            return self._statistics
 
     def manage_cache(self, force_words_update=False, force_definitions_update=False):
         """
@@ -40,7 +107,8 @@ class CacheManager:
 
         if not os.path.exists(DEFS_FILE) or force_definitions_update:
             log("Recopilando todas las definiciones del castellano.", level="INFO")
-            self.definitions = self._fetch_definitions()
+            self.definitions = self._load_definitions(force_update=True)
+            self._statistics = None
 
     def number_of_words(self, letter=None):
         """
@@ -53,9 +121,9 @@ class CacheManager:
         Returns:
             int: The number of words that starts with the letter 'letter'.
         """
-        if letter is None:
-            return sum(len(words) for words in self.definitions.values())
-        return len(self.definitions[letter])
+        if self.database is not None:
+            return self.database.number_of_words(letter)
+        return self.statistics.number_of_words(letter)
 
     def number_of_definitions(self, letter=None):
         """
@@ -68,19 +136,29 @@ class CacheManager:
         Returns:
             int: The number of definitions of the words that starts with the letter 'letter'.
         """
-        if letter is None:
-            return sum(
-                sum(len(definitions_list) for definitions_list in definitions_dict.values())
-                for definitions_dict in self.definitions.values()
-            )
-        return sum(len(defs) for defs in self.definitions[letter].values())
+        if self.database is not None:
+            return self.database.number_of_definitions(letter)
+        return self.statistics.number_of_definitions(letter)
 
     def max_words_letter(self):
         """
         Returns:
             int: The letter who has the maximum number of words stored in the system.
         """
-        return max(self.definitions.keys(), key=lambda letter: self.number_of_words(letter=letter))
+        if self.database is not None:
+            return self.database.max_words_letter()
+        return self.statistics.max_words_letter()
+
+    def definition_lengths(self, letter=None):
+        """
+        Args:
+            letter (str, optional): The letter to recover the histogram of its definitions.
+
+        Returns:
+            dict: The number of definitions by length (in words), grouped in buckets of
+                  StatisticsManifest.LENGTH_BUCKET words.
+        """
+        return self.statistics.definition_lengths(letter)
 
     # Fetchers: where all the API Calls are made and stored into the JSON files.
     def _load_words(self, force_update=False, show_log=True):
@@ -89,12 +167,49 @@ class CacheManager:
         return load_data(WORDS_FILE)
 
     def _load_definitions(self, force_update=False, show_log=True):
+        if self.lazy and self.database is None:
+            if force_update:
+                self._fetch_definitions(show_log=show_log)
+            fetched_letters = self._get_fetched_letters()
+            return LazyDefinitions(
+                (letter for letter in ALL_LETTERS if letter in fetched_letters), max_letters=self.max_letters
+            )
+        if self.compact and self.database is None and not force_update and \
+                file_is_updated(INDEX_FILE, self._definition_files()):
+            try:
+                return MappedCorpus(INDEX_FILE)
+            except IndexFileError as error:
+                # E.g. it was built by a previous version, the definitions are loaded from the json files.
+                log(f"No se puede usar el índice: {error}", level="WARNING", show_log=show_log)
+
         if not os.path.exists(DEFS_FILE) or force_update:
-            return self._fetch_definitions(show_log=show_log)
-        return load_data(DEFS_FILE)
+            definitions = self._fetch_definitions(show_log=show_log)
+        else:
+            definitions = load_data(DEFS_FILE)
+
+        if self.database is not None:
+            return None
+        return Corpus(definitions) if self.compact else definitions
+
+    def _load_statistics(self):
+        if file_is_updated(STATS_FILE, self._definition_files()):
+            return StatisticsManifest.load(STATS_FILE)
+        statistics = StatisticsManifest.from_definitions(self.definitions)
+        statistics.save(STATS_FILE)
+        return statistics
 
     @staticmethod
-    def _fetch_words(show_log=True):
+    def _new_telemetry():
+        # Each crawl has its own telemetry, so the telemetry files only hold the last one.
+        return CrawlTelemetry(TELEMETRY_FILE, TELEMETRY_SUMMARY_FILE, interval=TELEMETRY_INTERVAL)
+
+    def _record_request(self, url, status_code, latency, size, retry):
+        # The 'on_request' callback of the APIs.
+        self.telemetry.record_request(url, status_code, latency, size, retry)
+        if self.on_request is not None:
+            self.on_request(url, status_code, latency, size, retry)
+
+    def _fetch_words(self, show_log=True):
         """
         This method uses the WordsAPI to recover all the words in the language.
 
@@ -102,13 +217,15 @@ class CacheManager:
             dict: all the words indexed by first letter.
         """
         words_dict = dict()
-        words_api = WordsAPI()
+        words_api = WordsAPI(base_url=self.words_api_url, on_request=self._record_request)
 
         for letter in words_api.LETTERS:
             log(f"Ahora con la letra:\t{letter}", show_log=show_log)
-            words = parse_word(words_api.get_words(letter))
-            words_dict[letter].union(words)
+            words = parse_word_lxml(words_api.get_words(letter))
+            words_dict[letter] = sorted(words)
         save_data(WORDS_FILE, words_dict)
+        if self.database is not None:
+            self.database.save_words(words_dict)
         return words_dict
 
     def _fetch_definitions(self, show_log=True):
@@ -125,6 +242,8 @@ class CacheManager:
 
         fetched_letters = self._get_fetched_letters()
         missing_letters = set(ALL_LETTERS) - fetched_letters
+        if missing_letters:
+            self.telemetry = self._new_telemetry()
         for letter in missing_letters:
             definition_dict[letter] = self._fetch_definitions_per_letter(letter)
 
@@ -135,10 +254,25 @@ class CacheManager:
         save_data(DEFS_FILE, definition_dict)
         return definition_dict
 
+    def _definitions_pipeline(self):
+        """
+        Returns:
+            CrawlPipeline: A pipeline that fetches the definitions of words with 'workers' threads, and parses them
+                           in a process pool.
+        """
+        rate_limiter = TokenBucket(self.rate_limit) if self.rate_limit > 0 else None
+        dict_api = DictAPI(
+            base_url=self.dict_api_url, rate_limiter=rate_limiter, pool_size=self.workers,
+            on_request=self._record_request
+        )
+        return CrawlPipeline(dict_api.get_definitions, parse_definitions_lxml, fetchers=self.workers)
+
     def _fetch_definitions_per_letter(self, letter, show_log=True):
         """
         This method uses the DictAPI to recover all the definitions for the stored words that
         starts with letter 'letter'.
+        Every word is journaled as soon as its definitions are fetched (see DefinitionsJournal), so if the fetch
+        stops halfway, the next one skips the words already journaled.
 
         Args:
             letter (str): The letter to recover word's definitions.
@@ -146,20 +280,138 @@ class CacheManager:
         Returns:
             dict: all the definition list indexed by word.
         """
-        letter_definitions = dict()
-        dict_api = DictAPI()
+        journal = DefinitionsJournal(letter)
+        letter_definitions = journal.load()
 
         total_words = len(self.words[letter])
-        log_counter = total_words // 20
+        # Every 5%, and every word for the letters with less than 20 words.
+        log_counter = max(total_words // 20, 1)
 
         log(f"Descargando las definiciones de la letra:\t{letter}", show_log=show_log)
         log(f"Son {total_words} palabras.", show_log=show_log)
-
-        for count, word in enumerate(self.words[letter]):
-            if count % log_counter == 0:
-                log(f"{count} de {total_words}", show_log=show_log)
-            definitions = parse_definitions(dict_api.get_definitions(word))
-            letter_definitions[word] = definitions
+        if letter_definitions:
+            log(f"Retomando la descarga: {len(letter_definitions)} palabras ya descargadas.", show_log=show_log)
+
+        pending_words = list(word for word in self.words[letter] if word not in letter_definitions)
+        pipeline = self._definitions_pipeline()
+        self.telemetry.start_letter(letter, total_words, done_words=len(letter_definitions))
+        with journal:
+            for count, (word, definitions) in enumerate(pipeline.run(pending_words), len(letter_definitions)):
+                if count % log_counter == 0:
+                    progress = self.telemetry.progress(letter)
+                    eta = timedelta(seconds=round(progress["eta"])) if progress["eta"] is not None else "?"
+                    queue_depths = pipeline.queue_depths()
+                    log(
+                        f"{count} de {total_words}\t({progress['words_per_second']:.1f} palabras/s, "
+                        f"quedan {eta}; en cola: {queue_depths['fetch']} por descargar, "
+                        f"{queue_depths['parse']} por analizar, {queue_depths['write']} por escribir)",
+                        show_log=show_log
+                    )
+                letter_definitions[word] = definitions
+                journal.append(word, definitions)
+                self.telemetry.word_done(letter)
+        self.telemetry.finish_letter(letter)
+
+        # The words are fetched in any order, but they are stored in the order of the word list.
+        letter_definitions = {
+            word: letter_definitions[word] for word in self.words[letter] if word in letter_definitions
+        }
         log(f"Serializando las definiciones de la letra '{letter}'...", start="\n", show_log=show_log)
-        save_data(f"{DEFS_DIR}/{letter}.json", letter_definitions)
+        self._save_letter(letter, letter_definitions)
         return letter_definitions
+
+    def _save_letter(self, letter, letter_definitions):
+        # It (re)writes the json file of the letter and updates the statistics and the database.
+        # The statistics are loaded before the letter file changes, so an updated manifest is still used.
+        statistics = self.statistics
+        DefinitionsJournal(letter).compact(letter_definitions)
+        if statistics is not None:
+            statistics.update_letter(letter, letter_definitions)
+            statistics.save(STATS_FILE)
+        if self.database is not None:
+            self.database.save_letter(letter, letter_definitions)
+
+    def refresh_definitions(self, sample_size=None, show_log=True):
+        """
+        The incremental update of the definitions. The current word list is compared with the words of each
+        letter file, so only the definitions of the new words are fetched and the removed words are dropped.
+        Also, a rotating sample of 'sample_size' old words per letter is fetched again to find the changed
+        definitions: each refresh continues the sample where the previous one stopped.
+        The letters that were never fetched are fully fetched.
+
+        The changes are saved in the REFRESH_REPORT_FILE, and only the letters with changes are rewritten.
+
+        Args:
+            sample_size (int, optional): The number of old words per letter to revalidate.
+            show_log (bool, optional): If true, it logs the changes of each letter.
+
+        Returns:
+            dict: The change report.
+        """
+        if sample_size is None:
+            sample_size = REFRESH_SAMPLE_SIZE
+
+        self.telemetry = self._new_telemetry()
+        previous_report = load_data(REFRESH_REPORT_FILE) if os.path.exists(REFRESH_REPORT_FILE) else dict()
+        sample_offsets = previous_report.get("sample_offsets", dict())
+        report = {
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "letters": dict(),
+            "sample_offsets": dict(),
+        }
+
+        fetched_letters = self._get_fetched_letters()
+        definition_dict = dict()
+        for letter, words in self.words.items():
+            if letter not in fetched_letters:
+                definition_dict[letter] = self._fetch_definitions_per_letter(letter, show_log=show_log)
+                report["letters"][letter] = {
+                    "added": list(definition_dict[letter]), "removed": list(), "changed": list()
+                }
+                continue
+
+            stored_definitions = load_data(f"{DEFS_DIR}/{letter}.json")
+            current_words = set(words)
+            added = list(word for word in words if word not in stored_definitions)
+            removed = list(word for word in stored_definitions if word not in current_words)
+
+            kept_words = sorted(word for word in stored_definitions if word in current_words)
+            offset = sample_offsets.get(letter, 0) % len(kept_words) if kept_words else 0
+            sample = (kept_words[offset:] + kept_words[:offset])[:sample_size]
+            report["sample_offsets"][letter] = (offset + len(sample)) % len(kept_words) if kept_words else 0
+
+            fetched_definitions = dict()
+            self.telemetry.start_letter(letter, len(added) + len(sample))
+            for word, definitions in self._definitions_pipeline().run(added + sample):
+                fetched_definitions[word] = definitions
+                self.telemetry.word_done(letter)
+            self.telemetry.finish_letter(letter)
+            changed = list(word for word in sample if fetched_definitions[word] != stored_definitions[word])
+
+            if added or removed or changed:
+                letter_definitions = {
+                    word: fetched_definitions[word] if word in fetched_definitions else stored_definitions[word]
+                    for word in words
+                }
+                self._save_letter(letter, letter_definitions)
+            else:
+                letter_definitions = stored_definitions
+            definition_dict[letter] = letter_definitions
+            report["letters"][letter] = {"added": added, "removed": removed, "changed": changed}
+            log(
+                f"Letra '{letter}': {len(added)} palabras nuevas, {len(removed)} eliminadas "
+                f"y {len(changed)} de {len(sample)} revisadas con cambios.",
+                show_log=show_log
+            )
+
+        report["totals"] = {
+            change: sum(len(letter_report[change]) for letter_report in report["letters"].values())
+            for change in ("added", "removed", "changed")
+        }
+        log("Serializando todas las definiciones...", show_log=show_log)
+        save_data(DEFS_FILE, definition_dict)
+        save_data(REFRESH_REPORT_FILE, report)
+
+        self.definitions = self._load_definitions(show_log=False)
+        self._statistics = None
+        return report
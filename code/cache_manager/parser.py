@@ -1,5 +1,10 @@
 # HTML parsers
 from bs4 import BeautifulSoup
+from lxml import etree, html
+
+# The elements with the class 'j' (among others), like BeautifulSoup matches them.
+DEFINITIONS_XPATH = etree.XPath('//p[contains(concat(" ", normalize-space(@class), " "), " j ")]')
+RESULTS_XPATH = etree.XPath('//div[@id="columna_resultados_generales"]')
 
 
 def parse_word(words_to_parse):
@@ -27,3 +32,37 @@ def parse_definitions(definitions_to_parse):
             for definition in soup.find_all("p", attrs={"class": "j"}):
                 definitions.append(definition.text[3:])
     return definitions
+
+
+# Faster parsers, with the same output, that use lxml directly instead of building a BeautifulSoup tree.
+def _html_tree(text):
+    try:
+        return html.document_fromstring(text)
+    except etree.ParserError:
+        # An empty document.
+        return None
+
+
+def parse_word_lxml(words_to_parse):
+    """
+    The same as parse_word, with lxml.
+    """
+    tree = _html_tree(words_to_parse)
+    results = RESULTS_XPATH(tree) if tree is not None else list()
+    if not results:
+        # Like parse_word, it fails if there is no results section.
+        raise AttributeError("The words page has no results section")
+    return set(str(word.text_content().strip()) for word in results[0].iter("a"))
+
+
+def parse_definitions_lxml(definitions_to_parse):
+    """
+    The same as parse_definitions, with lxml.
+    """
+    definitions = list()
+    if definitions_to_parse is not None:
+        for definition_to_parse in definitions_to_parse:
+            if (tree := _html_tree(definition_to_parse)) is not None:
+                for definition in DEFINITIONS_XPATH(tree):
+                    definitions.append(definition.text_content()[3:])
+    return definitions
@@ -0,0 +1,150 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from queue import Empty, Full, Queue
+from threading import Event, Lock, Thread
+
+# Marks the end of the items in a queue.
+_END = object()
+# Seconds between the checks of the stop event while waiting on a queue.
+_POLL_TIME = 0.1
+
+
+class CrawlPipeline:
+    """
+    A crawl split in three stages connected by bounded queues, so each stage works at its own pace
+    and a slow stage makes the previous ones wait instead of piling up data:
+        - fetch: 'fetchers' threads download the raw responses of the items (network bound).
+        - parse: 'parsers' worker processes parse the raw responses (CPU bound), out of the fetchers way.
+        - write: the consumer of 'run' gets the parsed results (e.g. to journal them), one by one.
+
+    The results come in completion order. If any stage fails, the whole pipeline stops, and 'run' raises the error
+    after the results already parsed.
+    A pipeline can only be run once.
+    """
+    def __init__(self, fetch, parse, fetchers=8, parsers=None, queue_size=64):
+        """
+        Args:
+            fetch (callable): It downloads the raw response of an item. It is called from several threads.
+            parse (callable): It parses a raw response. It must be picklable (a module level function).
+            fetchers (int, optional): The number of fetching threads.
+            parsers (int, optional): The number of parsing processes. By default, one per CPU.
+            queue_size (int, optional): The maximum number of items waiting between two stages.
+        """
+        self.fetch = fetch
+        self.parse = parse
+        self.fetchers = fetchers
+        self.parsers = parsers if parsers is not None else os.cpu_count() or 1
+        self.queue_size = queue_size
+
+        self._pending_items = Queue()
+        self._raw_responses = Queue(maxsize=queue_size)
+        self._parsed_results = Queue(maxsize=queue_size)
+        self._stop = Event()
+        self._error = None
+        self._running_fetchers = 0
+        self._lock = Lock()
+
+    def queue_depths(self):
+        """
+        Returns:
+            dict: The number of items waiting to be fetched, parsed and written.
+        """
+        return {
+            "fetch": self._pending_items.qsize(),
+            "parse": self._raw_responses.qsize(),
+            "write": self._parsed_results.qsize(),
+        }
+
+    def _put(self, queue, item):
+        # A blocking put that gives up when the pipeline stops, so no thread is left waiting on a full queue.
+        while not self._stop.is_set():
+            try:
+                queue.put(item, timeout=_POLL_TIME)
+                return True
+            except Full:
+                continue
+        return False
+
+    def _fail(self, error):
+        with self._lock:
+            if self._error is None:
+                self._error = error
+        self._stop.set()
+
+    def _fetcher(self):
+        try:
+            while not self._stop.is_set():
+                try:
+                    item = self._pending_items.get_nowait()
+                except Empty:
+                    break
+                if not self._put(self._raw_responses, (item, self.fetch(item))):
+                    break
+        except Exception as e:
+            self._fail(e)
+        finally:
+            with self._lock:
+                self._running_fetchers -= 1
+                last_fetcher = self._running_fetchers == 0
+            if last_fetcher:
+                for _ in range(self.parsers):
+                    self._put(self._raw_responses, _END)
+
+    def _parser(self, executor):
+        try:
+            while not self._stop.is_set():
+                try:
+                    raw_response = self._raw_responses.get(timeout=_POLL_TIME)
+                except Empty:
+                    continue
+                if raw_response is _END:
+                    break
+                item, response = raw_response
+                if not self._put(self._parsed_results, (item, executor.submit(self.parse, response).result())):
+                    break
+        except Exception as e:
+            self._fail(e)
+
+    def run(self, items):
+        """
+        Args:
+            items (iterable): The items to crawl.
+
+        Yields:
+            tuple: Each item with its parsed result, in completion order.
+
+        Raises:
+            Exception: The first error of any stage.
+        """
+        items = list(items)
+        if not items:
+            return
+        for item in items:
+            self._pending_items.put(item)
+
+        self._running_fetchers = self.fetchers
+        with ProcessPoolExecutor(max_workers=self.parsers) as executor:
+            # The worker processes are started before the threads, so they are not forked from a multithreaded
+            # process.
+            executor.submit(os.getpid).result()
+            threads = list(Thread(target=self._fetcher, daemon=True) for _ in range(self.fetchers))
+            threads += list(Thread(target=self._parser, args=(executor,), daemon=True) for _ in range(self.parsers))
+            for thread in threads:
+                thread.start()
+
+            try:
+                for _ in range(len(items)):
+                    yield self._get_result()
+            finally:
+                self._stop.set()
+                for thread in threads:
+                    thread.join()
+
+    def _get_result(self):
+        # The results parsed before an error are still returned, so they can be journaled.
+        while True:
+            try:
+                return self._parsed_results.get(timeout=_POLL_TIME)
+            except Empty:
+                if self._error is not None:
+                    raise self._error
@@ -0,0 +1,35 @@
+from threading import Lock
+from time import monotonic, sleep
+
+
+class TokenBucket:
+    """
+    A thread safe token bucket rate limiter: it allows 'rate' requests per second on average,
+    with bursts of up to 'capacity' requests.
+    """
+    def __init__(self, rate, capacity=None):
+        """
+        Args:
+            rate (float): The number of tokens added per second.
+            capacity (float, optional): The maximum number of tokens. By default, one second of tokens.
+        """
+        if rate <= 0:
+            raise Exception(f"Rate '{rate}' not supported, it must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = monotonic()
+        self._lock = Lock()
+
+    def acquire(self):
+        # It blocks until a token is available, and takes it.
+        while True:
+            with self._lock:
+                now = monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                waiting_time = (1 - self._tokens) / self.rate
+            sleep(waiting_time)
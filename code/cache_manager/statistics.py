@@ -0,0 +1,98 @@
+from code.utils import load_data, save_data
+
+
+class StatisticsManifest:
+    """
+    The statistics of the stored definitions, computed once per letter when the definitions are fetched
+    or loaded and persisted in a json file, so every statistic is answered in constant time:
+        - letters: The number of words, of definitions and the histogram of the definition lengths of each letter.
+        - totals: The same statistics for the whole dictionary.
+        - top_letters: The letters sorted by their number of words, from the most to the least.
+
+    The definition lengths are counted in words, grouped in buckets of LENGTH_BUCKET words.
+    """
+    LENGTH_BUCKET = 5
+
+    def __init__(self, letters=None):
+        """
+        Args:
+            letters (dict, optional): The statistics of each letter, as stored in the manifest.
+        """
+        self.letters = letters if letters is not None else dict()
+        self._aggregate()
+
+    @classmethod
+    def from_definitions(cls, definitions):
+        """
+        Args:
+            definitions (Mapping): The definitions indexed by letter and word (e.g ['1st_letter']['word']).
+
+        Returns:
+            StatisticsManifest: The statistics of all the definitions.
+        """
+        manifest = cls()
+        for letter in definitions:
+            manifest.letters[letter] = cls._letter_statistics(definitions[letter])
+        manifest._aggregate()
+        return manifest
+
+    @classmethod
+    def load(cls, manifest_file):
+        return cls(load_data(manifest_file)["letters"])
+
+    def save(self, manifest_file):
+        save_data(manifest_file, {"letters": self.letters, "totals": self.totals, "top_letters": self.top_letters})
+
+    @classmethod
+    def _letter_statistics(cls, letter_definitions):
+        histogram = dict()
+        number_of_definitions = 0
+        for definitions in letter_definitions.values():
+            number_of_definitions += len(definitions)
+            for definition in definitions:
+                bucket = str(len(definition.split()) // cls.LENGTH_BUCKET * cls.LENGTH_BUCKET)
+                histogram[bucket] = histogram.get(bucket, 0) + 1
+        return {
+            "words": len(letter_definitions),
+            "definitions": number_of_definitions,
+            "definition_lengths": dict(sorted(histogram.items(), key=lambda item: int(item[0]))),
+        }
+
+    def _aggregate(self):
+        histogram = dict()
+        for statistics in self.letters.values():
+            for bucket, count in statistics["definition_lengths"].items():
+                histogram[bucket] = histogram.get(bucket, 0) + count
+
+        self.totals = {
+            "words": sum(statistics["words"] for statistics in self.letters.values()),
+            "definitions": sum(statistics["definitions"] for statistics in self.letters.values()),
+            "definition_lengths": dict(sorted(histogram.items(), key=lambda item: int(item[0]))),
+        }
+        self.top_letters = sorted(self.letters, key=lambda letter: self.letters[letter]["words"], reverse=True)
+
+    def update_letter(self, letter, letter_definitions):
+        """
+        It recomputes the statistics of one letter, when its definitions are rewritten.
+
+        Args:
+            letter (str): The letter.
+            letter_definitions (dict): All the definition lists of the letter, indexed by word.
+        """
+        self.letters[letter] = self._letter_statistics(letter_definitions)
+        self._aggregate()
+
+    def _statistics(self, letter):
+        return self.totals if letter is None else self.letters[letter]
+
+    def number_of_words(self, letter=None):
+        return self._statistics(letter)["words"]
+
+    def number_of_definitions(self, letter=None):
+        return self._statistics(letter)["definitions"]
+
+    def definition_lengths(self, letter=None):
+        return self._statistics(letter)["definition_lengths"]
+
+    def max_words_letter(self):
+        return self.top_letters[0] if self.top_letters else None
@@ -0,0 +1,167 @@
+import json
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime, timezone
+from threading import Lock
+from time import monotonic
+
+from code.utils import save_data
+
+
+class _RequestStats:
+    # The latency histogram, status codes and bytes of a group of requests.
+    # The upper bounds of the latency buckets, in seconds. The last bucket has no bound.
+    LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.bytes = 0
+        self.total_latency = 0
+        self.status_codes = Counter()
+        self.latency_histogram = [0] * (len(self.LATENCY_BUCKETS) + 1)
+
+    def add(self, status_code, latency, size, retry):
+        self.requests += 1
+        self.retries += retry
+        self.bytes += size
+        self.total_latency += latency
+        # The failed requests (without response) are counted as "error".
+        self.status_codes[str(status_code) if status_code is not None else "error"] += 1
+        self.latency_histogram[bisect_left(self.LATENCY_BUCKETS, latency)] += 1
+
+    def to_dict(self):
+        bucket_names = list(f"<={bound}s" for bound in self.LATENCY_BUCKETS) + [f">{self.LATENCY_BUCKETS[-1]}s"]
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "bytes": self.bytes,
+            "mean_latency": self.total_latency / self.requests if self.requests else 0,
+            "status_codes": dict(self.status_codes),
+            "latency_histogram": dict(zip(bucket_names, self.latency_histogram)),
+        }
+
+
+class CrawlTelemetry:
+    """
+    The telemetry of a crawl: the latency histogram, status codes and bytes of the requests, and the progress
+    (words/s and ETA) of each letter.
+
+    The requests are recorded with 'record_request', given as the 'on_request' callback of the APIs (see API),
+    and they are counted in the totals and in the letter being crawled. The progress of a letter is recorded with
+    'start_letter', 'word_done' and 'finish_letter'.
+
+    Every 'interval' seconds, and at the end of each letter, the state of the letter is appended as a JSON line
+    to the 'log_file', and the summary of the whole crawl is written to the 'summary_file'.
+    The first report truncates the 'log_file', so it only holds the reports of this crawl.
+    """
+    def __init__(self, log_file, summary_file, interval=10):
+        """
+        Args:
+            log_file (str): The JSON lines file with the periodic reports.
+            summary_file (str): The JSON file with the summary of the crawl.
+            interval (float, optional): The seconds between two periodic reports of a letter.
+        """
+        self.log_file = log_file
+        self.summary_file = summary_file
+        self.interval = interval
+        self.start_date = datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+        self.totals = _RequestStats()
+        self.letters = dict()
+        self._letter = None
+        self._last_report = monotonic()
+        self._lock = Lock()
+        self._log_lock = Lock()
+        self._log_started = False
+
+    def record_request(self, url, status_code, latency, size, retry):
+        with self._lock:
+            self.totals.add(status_code, latency, size, retry)
+            if self._letter is not None:
+                self.letters[self._letter]["requests"].add(status_code, latency, size, retry)
+
+    def start_letter(self, letter, total_words, done_words=0):
+        """
+        Args:
+            letter (str): The letter to crawl.
+            total_words (int): The number of words of the letter.
+            done_words (int, optional): The number of words already fetched (e.g. by a previous crawl).
+        """
+        with self._lock:
+            self._letter = letter
+            self.letters[letter] = {
+                "total_words": total_words,
+                "done_words": done_words,
+                "resumed_words": done_words,
+                "start_time": monotonic(),
+                "end_time": None,
+                "requests": _RequestStats(),
+            }
+            self._last_report = monotonic()
+
+    def word_done(self, letter):
+        # It also appends the periodic report of the letter, if it is due.
+        with self._lock:
+            self.letters[letter]["done_words"] += 1
+            report_due = monotonic() - self._last_report >= self.interval
+            if report_due:
+                self._last_report = monotonic()
+        if report_due:
+            self._append_report("progress", letter)
+
+    def finish_letter(self, letter):
+        with self._lock:
+            self.letters[letter]["end_time"] = monotonic()
+            self._letter = None
+        self._append_report("letter", letter)
+        self.save_summary()
+
+    def progress(self, letter):
+        """
+        Args:
+            letter (str): A crawled letter.
+
+        Returns:
+            dict: The words done, the words per second and the ETA in seconds (None while it is unknown)
+                  of the letter, with the stats of its requests.
+        """
+        with self._lock:
+            state = self.letters[letter]
+            elapsed_time = (state["end_time"] or monotonic()) - state["start_time"]
+            fetched_words = state["done_words"] - state["resumed_words"]
+            words_per_second = fetched_words / elapsed_time if elapsed_time > 0 else 0
+            pending_words = state["total_words"] - state["done_words"]
+            return {
+                "letter": letter,
+                "total_words": state["total_words"],
+                "done_words": state["done_words"],
+                "elapsed_time": elapsed_time,
+                "words_per_second": words_per_second,
+                "eta": pending_words / words_per_second if words_per_second > 0 else None,
+                **state["requests"].to_dict(),
+            }
+
+    def summary(self):
+        """
+        Returns:
+            dict: The progress of every letter and the stats of all the requests.
+        """
+        letters = {letter: self.progress(letter) for letter in list(self.letters)}
+        with self._lock:
+            totals = self.totals.to_dict()
+        return {"start_date": self.start_date, "letters": letters, "totals": totals}
+
+    def save_summary(self):
+        save_data(self.summary_file, self.summary())
+
+    def _append_report(self, event, letter):
+        report = {
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "event": event,
+            **self.progress(letter),
+        }
+        with self._log_lock:
+            with open(self.log_file, "a" if self._log_started else "w", encoding="utf-8") as file:
+                file.write(json.dumps(report, ensure_ascii=False) + "\n")
+            self._log_started = True
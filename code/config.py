@@ -4,6 +4,26 @@ DATA_DIR = "data"
 WORDS_FILE = f"{DATA_DIR}/palabras.json"
 DEFS_FILE = f"{DATA_DIR}/definiciones.json"
 DEFS_DIR = f"{DATA_DIR}/definiciones"
+STATS_FILE = f"{DATA_DIR}/estadisticas.json"
+REFRESH_REPORT_FILE = f"{DATA_DIR}/cambios.json"
+DB_FILE = f"{DATA_DIR}/diccionario.sqlite3"
+INDEX_FILE = f"{DATA_DIR}/indice.bin"
+
+# Base URLs of the words and definitions APIs. They can point to a local FakeServer (see cache_manager.fake_server)
+WORDS_API_URL = "https://www.listapalabras.com"
+DICT_API_URL = "https://dle.rae.es/data"
+
+# Definitions crawl: number of concurrent requests and maximum requests per second to the RAE API (0 for no limit)
+CRAWL_WORKERS = 8
+CRAWL_RATE_LIMIT = 20
+
+# Crawl telemetry: periodic reports (JSON lines), final summary and seconds between two reports of a letter
+TELEMETRY_FILE = f"{DATA_DIR}/telemetria.jsonl"
+TELEMETRY_SUMMARY_FILE = f"{DATA_DIR}/telemetria.json"
+TELEMETRY_INTERVAL = 10
+
+# Number of already fetched words per letter whose definitions are checked again on each incremental refresh
+REFRESH_SAMPLE_SIZE = 50
 
 # Letters of the Dictionary
 ALL_LETTERS = "QWERTYUIOPASDFGHJKLÑZXCVBNM"
@@ -54,12 +54,19 @@ MENU = [
 ]
 
 
+MORE_RESULTS = "¿Quieres ver más resultados? [s/N] "
+NO_EXACT_RESULTS = "No hay resultados exactos. Estas son las palabras con un significado más parecido:"
+
+# Number of results shown at once in the inverse search
+PAGE_SIZE = 20
+
+
 def prompt(mode):
     return f"[MODO {mode}]>> "
 
 
 # Global variables and functions
-cache_manager = CacheManager()
+cache_manager = CacheManager(compact=True)
 search_engine = SearchEngine(cache_manager.definitions)
 
 
@@ -77,8 +84,15 @@ def inverse_search():
                 log("No reconozco ese comando.", level="INFO")
         else:
             print("Resultados:")
-            for result in search_engine.search(query):
+            count = 0
+            for count, result in enumerate(search_engine.search_iter(query), 1):
                 print(result)
+                if count % PAGE_SIZE == 0 and input(MORE_RESULTS).lower() != "s":
+                    break
+            if count == 0:
+                print(NO_EXACT_RESULTS)
+                for result in search_engine.similar(query, limit=PAGE_SIZE):
+                    print(result)
 
 
 def direct_search():
@@ -0,0 +1,215 @@
+# Compact in-memory representation of the dictionary
+import sys
+from array import array
+from collections.abc import Mapping, Sequence
+
+from code.utils import Formatter
+
+
+class StringTable(Sequence):
+    """
+    A sequence of strings stored in a single UTF-8 blob (bytes or a memoryview), sliced by an array with the offset
+    of each string plus the end of the last one. The strings are only decoded when they are accessed.
+    """
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings):
+        blob = bytearray()
+        offsets = array("I", [0])
+        for string in strings:
+            blob += string.encode("utf-8")
+            offsets.append(len(blob))
+        return cls(bytes(blob), offsets)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self[position] for position in range(*index.indices(len(self))))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("StringTable index out of range")
+        return str(self.blob[self.offsets[index]:self.offsets[index + 1]], "utf-8")
+
+    def __iter__(self):
+        blob, offsets = self.blob, self.offsets
+        for index in range(len(offsets) - 1):
+            yield str(blob[offsets[index]:offsets[index + 1]], "utf-8")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+class WordEntry:
+    """
+    A lightweight view of one word of the corpus, with the same interface as the word dicts
+    ({"word": ..., "definitions": [...]}) used by the Formatter.
+    Two entries are equal if they point to the same word of the same corpus.
+    """
+    __slots__ = ("corpus", "word_id")
+
+    def __init__(self, corpus, word_id):
+        self.corpus = corpus
+        self.word_id = word_id
+
+    def __getitem__(self, key):
+        if key == "word":
+            return self.corpus.words[self.word_id]
+        if key == "definitions":
+            return self.corpus.definitions_of(self.word_id)
+        raise KeyError(key)
+
+    def __eq__(self, other):
+        return isinstance(other, WordEntry) and self.corpus is other.corpus and self.word_id == other.word_id
+
+    def __hash__(self):
+        return self.word_id
+
+    def __repr__(self):
+        return f"WordEntry({self['word']!r})"
+
+
+class _LetterView(Mapping):
+    # The words of one letter, as a read-only {word: definitions} mapping.
+    def __init__(self, corpus, start, end):
+        self.corpus = corpus
+        self.start = start
+        self.end = end
+
+    def __getitem__(self, word):
+        word_id = self.corpus.word_ids[word]
+        if not self.start <= word_id < self.end:
+            raise KeyError(word)
+        return self.corpus.definitions_of(word_id)
+
+    def __iter__(self):
+        return (self.corpus.words[word_id] for word_id in range(self.start, self.end))
+
+    def __len__(self):
+        return self.end - self.start
+
+
+class _DefinitionOwners(Sequence):
+    # The word entry of each definition id.
+    def __init__(self, corpus):
+        self.corpus = corpus
+
+    def __getitem__(self, definition_id):
+        return WordEntry(self.corpus, self.corpus.owners[definition_id])
+
+    def __len__(self):
+        return len(self.corpus.owners)
+
+
+class Corpus(Mapping):
+    """
+    The whole dictionary stored in a few flat structures instead of nested dicts and lists:
+        - words: The interned words, in the dictionary order.
+        - A single UTF-8 blob with all the definitions, sliced by the 'definition_offsets' array.
+        - word_offsets: The id of the first definition of each word (definitions of a word are contiguous).
+        - owners: The word id of each definition.
+
+    It is also a read-only mapping {letter: {word: definitions}}, like the data loaded from the json files,
+    so the CacheManager and the SearchEngine can share the same single copy.
+    The flattened definitions, that the search works with, are also kept in the corpus as a StringTable,
+    built the first time they are needed.
+    """
+    def __init__(self, data):
+        """
+        Args:
+            data (Mapping): The definitions indexed by letter and word (e.g ['1st_letter']['word']).
+        """
+        self.words = list()
+        self.word_ids = dict()
+        self.letter_ranges = dict()
+        self.word_offsets = array("I", [0])
+        self.definition_offsets = array("I", [0])
+        self.owners = array("I")
+
+        # A word repeated in several letters keeps the place of the first one and the definitions of the last one,
+        # like in a single dict of all the words.
+        last_definitions = dict()
+        for words in data.values():
+            last_definitions.update(words)
+
+        blob = bytearray()
+        for letter, words in data.items():
+            start = len(self.words)
+            for word in words:
+                if word in self.word_ids:
+                    continue
+                word = sys.intern(word)
+                word_id = len(self.words)
+                self.word_ids[word] = word_id
+                self.words.append(word)
+                for definition in last_definitions[word]:
+                    blob += definition.encode("utf-8")
+                    self.definition_offsets.append(len(blob))
+                    self.owners.append(word_id)
+                self.word_offsets.append(len(self.owners))
+            self.letter_ranges[letter] = (start, len(self.words))
+        self._blob = bytes(blob)
+        self._flattened_definitions = None
+        self.definition_owners = _DefinitionOwners(self)
+
+    def __getitem__(self, letter):
+        start, end = self.letter_ranges[letter]
+        return _LetterView(self, start, end)
+
+    def __iter__(self):
+        return iter(self.letter_ranges)
+
+    def __len__(self):
+        return len(self.letter_ranges)
+
+    def number_of_definitions(self):
+        return len(self.owners)
+
+    def definition(self, definition_id):
+        start = self.definition_offsets[definition_id]
+        return str(self._blob[start:self.definition_offsets[definition_id + 1]], "utf-8")
+
+    def definitions_of(self, word_id):
+        return list(
+            self.definition(definition_id)
+            for definition_id in range(self.word_offsets[word_id], self.word_offsets[word_id + 1])
+        )
+
+    def flattened_definitions(self):
+        """
+        Returns:
+            StringTable: All the definitions without accent marks nor capital letters, by definition id.
+        """
+        if self._flattened_definitions is None:
+            self._flattened_definitions = StringTable.from_strings(
+                Formatter.flatten_text(self.definition(definition_id)) for definition_id in range(len(self.owners))
+            )
+        return self._flattened_definitions
+
+    def entry(self, word):
+        """
+        Returns:
+            WordEntry: The entry of the word.
+
+        Raises:
+            KeyError: If the word is not in the corpus.
+        """
+        return WordEntry(self, self.word_ids[word])
+
+    def entry_at(self, word_id):
+        return WordEntry(self, word_id)
+
+    def entries(self):
+        return (WordEntry(self, word_id) for word_id in range(len(self.words)))
+
+    def definition_ranges(self):
+        """
+        Returns:
+            dict: The (start, end) range of definition ids of each letter.
+        """
+        return {
+            letter: (self.word_offsets[start], self.word_offsets[end])
+            for letter, (start, end) in self.letter_ranges.items()
+        }
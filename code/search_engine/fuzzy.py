@@ -0,0 +1,133 @@
+# Typo-tolerant lookup of headwords
+from code.utils import Formatter
+
+
+def _deletes(word, max_distance):
+    """
+    Returns:
+        set: All the strings that result of deleting up to 'max_distance' characters of the word.
+    """
+    results = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = set(element[:i] + element[i + 1:] for element in frontier for i in range(len(element)))
+        results.update(frontier)
+    return results
+
+
+def _letters_mask(word):
+    """
+    Returns:
+        int: A bit mask of the characters that appear in the word.
+    """
+    mask = 0
+    for char in word:
+        mask |= 1 << (ord(char) % 64)
+    return mask
+
+
+def edit_distance(source, target, max_distance):
+    """
+    The Damerau-Levenshtein distance (optimal string alignment) between two strings.
+    It stops as soon as the distance is known to be greater than 'max_distance'.
+
+    Returns:
+        int: The distance, or max_distance + 1 if it is greater than max_distance.
+    """
+    if abs(len(source) - len(target)) > max_distance:
+        return max_distance + 1
+
+    # The common prefix and suffix do not change the distance.
+    start = 0
+    while start < len(source) and start < len(target) and source[start] == target[start]:
+        start += 1
+    end = 0
+    while end < len(source) - start and end < len(target) - start and source[-1 - end] == target[-1 - end]:
+        end += 1
+    source = source[start:len(source) - end]
+    target = target[start:len(target) - end]
+    if not source or not target:
+        return min(len(source) + len(target), max_distance + 1)
+
+    previous_row = None
+    row = list(range(len(target) + 1))
+    for i in range(1, len(source) + 1):
+        previous_row, row = row, [i] + [0] * len(target)
+        for j in range(1, len(target) + 1):
+            cost = 0 if source[i - 1] == target[j - 1] else 1
+            row[j] = min(previous_row[j] + 1, row[j - 1] + 1, previous_row[j - 1] + cost)
+            if i > 1 and j > 1 and source[i - 1] == target[j - 2] and source[i - 2] == target[j - 1]:
+                row[j] = min(row[j], two_rows_before[j - 2] + 1)
+        if min(row) > max_distance:
+            return max_distance + 1
+        two_rows_before = previous_row
+    return min(row[-1], max_distance + 1)
+
+
+class SymSpellIndex:
+    """
+    A symmetric delete (SymSpell) index over the flattened headwords, so the words within a small edit distance of
+    a query are found without comparing the query against the whole dictionary.
+
+    Only the deletes of the first 'prefix_length' characters are indexed to keep the index small,
+    and every candidate is verified with the real edit distance.
+    """
+    def __init__(self, words, max_distance=2, prefix_length=6):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.words = list(words)
+        self.flattened_words = list(Formatter.flatten_text(word) for word in self.words)
+        self.masks = list(_letters_mask(word) for word in self.flattened_words)
+
+        deletes = dict()
+        for word_id, flattened_word in enumerate(self.flattened_words):
+            for delete in _deletes(flattened_word[:prefix_length], max_distance):
+                deletes.setdefault(delete, list()).append(word_id)
+        self.deletes = deletes
+
+    def lookup(self, query, limit=5, max_distance=None):
+        """
+        It gets the closest headwords to the query. The words at a bigger distance are only looked for
+        if there are no words at a smaller one.
+
+        Args:
+            query (str): The (probably misspelled) word.
+            limit (int, optional): The maximum number of words to return.
+            max_distance (int, optional): The maximum edit distance. It cannot be greater than the index one.
+
+        Returns:
+            list: The closest words, ordered by distance and alphabetically.
+        """
+        if max_distance is None or max_distance > self.max_distance:
+            max_distance = self.max_distance
+
+        flattened_query = Formatter.flatten_text(query)
+        for distance in range(1, max_distance + 1):
+            if suggestions := self._lookup(flattened_query, distance):
+                return list(word for _, word in suggestions[:limit])
+        return list()
+
+    def _lookup(self, flattened_query, max_distance):
+        """
+        Returns:
+            list: The (distance, word) pairs of the words within 'max_distance' of the query, sorted.
+        """
+        candidates = set()
+        for delete in _deletes(flattened_query[:self.prefix_length], max_distance):
+            candidates.update(self.deletes.get(delete, ()))
+
+        suggestions = list()
+        query_length = len(flattened_query)
+        query_mask = _letters_mask(flattened_query)
+        for word_id in candidates:
+            # Cheap lower bounds: each edit changes the length by one at most and the set of characters by two.
+            if abs(len(self.flattened_words[word_id]) - query_length) > max_distance:
+                continue
+            if (query_mask ^ self.masks[word_id]).bit_count() > 2 * max_distance:
+                continue
+            distance = edit_distance(flattened_query, self.flattened_words[word_id], max_distance)
+            if distance <= max_distance:
+                suggestions.append((distance, self.words[word_id]))
+
+        suggestions.sort()
+        return suggestions
@@ -0,0 +1,354 @@
+# Search indexes
+import heapq
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+
+from code.utils import Formatter
+
+
+def _merge_posting_lists(posting_lists):
+    # The union of sorted posting lists, lazily and in order.
+    last_definition_id = None
+    for definition_id in heapq.merge(*posting_lists):
+        if definition_id != last_definition_id:
+            last_definition_id = definition_id
+            yield definition_id
+
+
+class TokenIndex:
+    """
+    An inverted index that maps every token of the flattened definitions to the sorted list
+    of definition ids (posting list) where that token appears.
+
+    The inverse search matches terms as substrings of the definitions, so a term is resolved to every
+    token of the vocabulary that contains it, and its posting lists are merged.
+    """
+    def __init__(self, flattened_definitions, postings=None):
+        """
+        Args:
+            flattened_definitions (Sequence): All the flattened definitions.
+            postings (Mapping, optional): The already built posting list of each token (see index_file).
+        """
+        if postings is None:
+            postings = dict()
+            for definition_id, definition in enumerate(flattened_definitions):
+                for token in set(definition.split()):
+                    postings.setdefault(token, list()).append(definition_id)
+
+        self.postings = postings
+        self.flattened_definitions = flattened_definitions
+        # All the vocabulary in a single string, so the tokens containing a term are found with str.find.
+        self._vocabulary = "\n" + "\n".join(postings) + "\n"
+
+    def _matching_tokens(self, term):
+        """
+        Args:
+            term (str): A flattened search term without whitespaces.
+
+        Returns:
+            list: All the tokens of the vocabulary that contain the term.
+        """
+        tokens = list()
+        vocabulary = self._vocabulary
+        start = 0
+        while (position := vocabulary.find(term, start)) != -1:
+            token_start = vocabulary.rfind("\n", 0, position) + 1
+            token_end = vocabulary.find("\n", position)
+            tokens.append(vocabulary[token_start:token_end])
+            start = token_end
+        return tokens
+
+    def candidates(self, search_terms):
+        """
+        It gets the definitions that contain all the search terms, intersecting the posting lists
+        of each term, smallest first.
+
+        Args:
+            search_terms (list): The flattened search terms.
+
+        Returns:
+            set: The ids of the definitions matching all the search terms.
+        """
+        indexed_terms = list()
+        unindexed_terms = list()
+        for term in search_terms:
+            if not term:
+                # The empty string is contained in every definition.
+                continue
+            if term.split() == [term]:
+                tokens = self._matching_tokens(term)
+                indexed_terms.append((sum(len(self.postings[token]) for token in tokens), term, tokens))
+            else:
+                unindexed_terms.append(term)
+
+        if not indexed_terms:
+            results = set(range(len(self.flattened_definitions)))
+        else:
+            indexed_terms.sort(key=lambda item: item[0])
+            results = None
+            for postings_size, term, tokens in indexed_terms:
+                if results is None and postings_size > len(self.flattened_definitions):
+                    # Very common terms are faster to check definition by definition.
+                    results = set(
+                        definition_id for definition_id, definition in enumerate(self.flattened_definitions)
+                        if term in definition
+                    )
+                elif results is None:
+                    results = set()
+                    for token in tokens:
+                        results.update(self.postings[token])
+                elif len(results) < postings_size:
+                    # Checking the few remaining candidates is cheaper than merging the posting lists.
+                    results = set(
+                        definition_id for definition_id in results if term in self.flattened_definitions[definition_id]
+                    )
+                else:
+                    term_results = set()
+                    for token in tokens:
+                        term_results.update(self.postings[token])
+                    results &= term_results
+
+                if len(results) == 0:
+                    break
+
+        if unindexed_terms:
+            results = set(
+                definition_id for definition_id in results
+                if all(term in self.flattened_definitions[definition_id] for term in unindexed_terms)
+            )
+        return results
+
+    def iter_candidates(self, search_terms):
+        """
+        The same as candidates, lazily and in order: the posting lists of the rarest term are merged one
+        definition at a time, and the rest of the terms are checked on each of them.
+
+        Args:
+            search_terms (list): The flattened search terms.
+
+        Yields:
+            int: The ids of the definitions matching all the search terms, in ascending order.
+        """
+        terms = list(term for term in search_terms if term)
+        rarest_term = None
+        for term in terms:
+            if term.split() == [term]:
+                tokens = self._matching_tokens(term)
+                postings_size = sum(len(self.postings[token]) for token in tokens)
+                if rarest_term is None or postings_size < rarest_term[0]:
+                    rarest_term = (postings_size, tokens)
+
+        if rarest_term is None or rarest_term[0] > len(self.flattened_definitions):
+            definition_ids = range(len(self.flattened_definitions))
+        else:
+            definition_ids = _merge_posting_lists(list(self.postings[token] for token in rarest_term[1]))
+
+        for definition_id in definition_ids:
+            definition = self.flattened_definitions[definition_id]
+            if all(term in definition for term in terms):
+                yield definition_id
+
+
+class TrigramIndex:
+    """
+    A character trigram index over the flattened definitions.
+
+    Each term is narrowed down to the definitions that contain all of its trigrams, and the survivors
+    are verified with the substring containment check, so the results are exactly the ones of the scan.
+    """
+    def __init__(self, flattened_definitions):
+        postings = dict()
+        for definition_id, definition in enumerate(flattened_definitions):
+            for trigram in set(definition[i:i + 3] for i in range(len(definition) - 2)):
+                postings.setdefault(trigram, list()).append(definition_id)
+
+        self.postings = postings
+        self.flattened_definitions = flattened_definitions
+
+    def candidates(self, search_terms):
+        """
+        It gets the definitions that contain all the search terms.
+
+        Args:
+            search_terms (list): The flattened search terms.
+
+        Returns:
+            set: The ids of the definitions matching all the search terms.
+        """
+        trigrams = set()
+        for term in search_terms:
+            trigrams.update(term[i:i + 3] for i in range(len(term) - 2))
+
+        posting_lists = sorted((self.postings.get(trigram, list()) for trigram in trigrams), key=len)
+        if posting_lists:
+            candidates = set(posting_lists[0])
+            for posting_list in posting_lists[1:]:
+                if len(candidates) == 0 or len(candidates) < len(posting_list) // 8:
+                    # The remaining candidates are cheaper to verify than to intersect.
+                    break
+                candidates.intersection_update(posting_list)
+        else:
+            candidates = range(len(self.flattened_definitions))
+
+        return set(
+            definition_id for definition_id in candidates
+            if all(term in self.flattened_definitions[definition_id] for term in search_terms)
+        )
+
+    def iter_candidates(self, search_terms):
+        """
+        The same as candidates, lazily and in order: the definitions of the rarest trigram are verified
+        one by one.
+
+        Args:
+            search_terms (list): The flattened search terms.
+
+        Yields:
+            int: The ids of the definitions matching all the search terms, in ascending order.
+        """
+        trigrams = set()
+        for term in search_terms:
+            trigrams.update(term[i:i + 3] for i in range(len(term) - 2))
+
+        if trigrams:
+            definition_ids = min((self.postings.get(trigram, list()) for trigram in trigrams), key=len)
+        else:
+            definition_ids = range(len(self.flattened_definitions))
+
+        for definition_id in definition_ids:
+            if all(term in self.flattened_definitions[definition_id] for term in search_terms):
+                yield definition_id
+
+
+class BufferScan:
+    """
+    An index-free scan over all the flattened definitions concatenated in a single string, one per line.
+    The terms are looked for with str.find (and patterns with compiled regular expressions) over the whole buffer,
+    and each hit is mapped back to its definition with a binary search over the definition offsets.
+    """
+    def __init__(self, flattened_definitions):
+        self.flattened_definitions = flattened_definitions
+        self.buffer = "\n".join(flattened_definitions) + "\n"
+
+        # The start of each definition in the buffer, plus the end of the buffer.
+        self.offsets = array("I", [0])
+        for definition in flattened_definitions:
+            self.offsets.append(self.offsets[-1] + len(definition) + 1)
+
+    def _find_all(self, term):
+        results = set()
+        position = self.buffer.find(term)
+        while position != -1:
+            definition_id = bisect_right(self.offsets, position) - 1
+            results.add(definition_id)
+            # The rest of the definition is already a hit.
+            position = self.buffer.find(term, self.offsets[definition_id + 1])
+        return results
+
+    def candidates(self, search_terms):
+        """
+        It gets the definitions that contain all the search terms. The longest term is looked for in the whole
+        buffer, and the rest only inside its hits.
+
+        Args:
+            search_terms (list): The flattened search terms.
+
+        Returns:
+            set: The ids of the definitions matching all the search terms.
+        """
+        terms = sorted(set(term for term in search_terms if term), key=len, reverse=True)
+        if not terms:
+            return set(range(len(self.flattened_definitions)))
+
+        results = self._find_all(terms[0])
+        for term in terms[1:]:
+            if len(results) == 0:
+                break
+            results = set(
+                definition_id for definition_id in results
+                if self.buffer.find(term, self.offsets[definition_id], self.offsets[definition_id + 1] - 1) != -1
+            )
+        return results
+
+    def iter_candidates(self, search_terms):
+        """
+        The same as candidates, lazily and in order: the buffer is searched forward for the longest term,
+        and the rest are checked inside each hit.
+
+        Args:
+            search_terms (list): The flattened search terms.
+
+        Yields:
+            int: The ids of the definitions matching all the search terms, in ascending order.
+        """
+        terms = sorted(set(term for term in search_terms if term), key=len, reverse=True)
+        if not terms:
+            yield from range(len(self.flattened_definitions))
+            return
+
+        position = self.buffer.find(terms[0])
+        while position != -1:
+            definition_id = bisect_right(self.offsets, position) - 1
+            start, end = self.offsets[definition_id], self.offsets[definition_id + 1] - 1
+            if all(self.buffer.find(term, start, end) != -1 for term in terms[1:]):
+                yield definition_id
+            position = self.buffer.find(terms[0], end + 1)
+
+    def match_pattern(self, pattern):
+        """
+        It gets the definitions where the regular expression matches. The pattern is run in MULTILINE mode,
+        so ^ and $ match the beginning and the end of each definition.
+
+        Args:
+            pattern (str): The regular expression.
+
+        Returns:
+            set: The ids of the matching definitions.
+
+        Raises:
+            re.error: If the pattern is not a valid regular expression.
+        """
+        compiled_pattern = re.compile(pattern, re.MULTILINE)
+        results = set()
+        position = 0
+        while (match := compiled_pattern.search(self.buffer, position)) is not None:
+            if match.start() >= self.offsets[-1]:
+                # An empty match after the last definition.
+                break
+            definition_id = bisect_right(self.offsets, match.start()) - 1
+            definition_end = self.offsets[definition_id + 1] - 1
+            # A match that crosses to the next definitions does not count, the definition is checked on its own.
+            if match.end() <= definition_end or compiled_pattern.search(
+                    self.buffer, self.offsets[definition_id], definition_end) is not None:
+                results.add(definition_id)
+            position = definition_end + 1
+        return results
+
+
+class PrefixIndex:
+    """
+    A sorted array of the flattened headwords, so the words starting with a prefix are found with a binary search
+    ignoring accent marks and capital letters.
+    """
+    def __init__(self, words):
+        entries = sorted((Formatter.flatten_text(word), word) for word in words)
+        self.keys = list(key for key, _ in entries)
+        self.words = list(word for _, word in entries)
+
+    def complete(self, prefix, limit=10):
+        """
+        Args:
+            prefix (str): The beginning of the words.
+            limit (int, optional): The maximum number of words to return.
+
+        Returns:
+            list: The words that start with the prefix, in alphabetical order.
+        """
+        flattened_prefix = Formatter.flatten_text(prefix)
+        results = list()
+        position = bisect_left(self.keys, flattened_prefix)
+        while position < len(self.keys) and len(results) < limit and self.keys[position].startswith(flattened_prefix):
+            results.append(self.words[position])
+            position += 1
+        return results
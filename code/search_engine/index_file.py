@@ -0,0 +1,205 @@
+# Prebuilt binary index file, opened with mmap
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+
+from code.search_engine.corpus import Corpus, StringTable, _DefinitionOwners
+from code.search_engine.index import TokenIndex
+
+INDEX_FILE_MAGIC = b"DICINV\0\0"
+INDEX_FILE_VERSION = 2
+
+# Magic, version and length of the JSON header that follows.
+PREAMBLE = struct.Struct("<8sII")
+ALIGNMENT = 8
+
+# The sections of the file, in order. The ones with a typecode are arrays of unsigned 32 bits integers.
+SECTIONS = (
+    ("words", None),
+    ("headword_offsets", "I"),
+    ("sorted_word_ids", "I"),
+    ("word_offsets", "I"),
+    ("definition_offsets", "I"),
+    ("owners", "I"),
+    ("definitions", None),
+    ("flattened_definitions", None),
+    ("flattened_definition_offsets", "I"),
+    ("tokens", None),
+    ("token_offsets", "I"),
+    ("postings", "I"),
+)
+
+
+class IndexFileError(Exception):
+    pass
+
+
+def _padding(length):
+    return b"\0" * (-length % ALIGNMENT)
+
+
+def write_index_file(corpus, index_file):
+    """
+    It writes the corpus, its flattened definitions and its token index into a versioned binary file:
+        - A preamble with the magic bytes, the version and the length of the JSON header.
+        - The JSON header, with the letter ranges and the (offset, length) of each section.
+        - The sections: the headwords blob, its offsets and the word ids in alphabetical order, the definitions
+          blob and its offsets, the flattened definitions blob and its offsets, and the posting lists of the
+          token index, each one aligned to 8 bytes.
+
+    Args:
+        corpus (Corpus): The dictionary.
+        index_file (str): The path of the file.
+    """
+    words = StringTable.from_strings(corpus.words)
+    flattened_definitions = corpus.flattened_definitions()
+    token_index = TokenIndex(flattened_definitions)
+    token_offsets = array("I", [0])
+    postings = array("I")
+    for posting_list in token_index.postings.values():
+        postings.extend(posting_list)
+        token_offsets.append(len(postings))
+
+    contents = {
+        "words": words.blob,
+        "headword_offsets": words.offsets.tobytes(),
+        "sorted_word_ids": array("I", sorted(range(len(words)), key=words.__getitem__)).tobytes(),
+        "word_offsets": corpus.word_offsets.tobytes(),
+        "definition_offsets": corpus.definition_offsets.tobytes(),
+        "owners": corpus.owners.tobytes(),
+        "definitions": corpus._blob,
+        "flattened_definitions": flattened_definitions.blob,
+        "flattened_definition_offsets": flattened_definitions.offsets.tobytes(),
+        "tokens": "\n".join(token_index.postings).encode("utf-8"),
+        "token_offsets": token_offsets.tobytes(),
+        "postings": postings.tobytes(),
+    }
+
+    sections = dict()
+    offset = 0
+    for name, _ in SECTIONS:
+        sections[name] = (offset, len(contents[name]))
+        offset += len(contents[name]) + len(_padding(len(contents[name])))
+
+    header = json.dumps({
+        "byteorder": sys.byteorder,
+        "letter_ranges": list([letter, start, end] for letter, (start, end) in corpus.letter_ranges.items()),
+        "sections": sections,
+    }).encode("utf-8")
+    # Padded with whitespaces, so it is still valid JSON.
+    header += b" " * len(_padding(PREAMBLE.size + len(header)))
+
+    with open(index_file, "wb") as file:
+        file.write(PREAMBLE.pack(INDEX_FILE_MAGIC, INDEX_FILE_VERSION, len(header)))
+        file.write(header)
+        for name, _ in SECTIONS:
+            file.write(contents[name])
+            file.write(_padding(len(contents[name])))
+
+
+class _MappedWordIds(Mapping):
+    # The id of each word, found by binary search over the word ids in alphabetical order.
+    def __init__(self, words, sorted_word_ids):
+        self.words = words
+        self.sorted_word_ids = sorted_word_ids
+
+    def __getitem__(self, word):
+        position = bisect_left(self.sorted_word_ids, word, key=self.words.__getitem__)
+        if position == len(self.sorted_word_ids) or self.words[self.sorted_word_ids[position]] != word:
+            raise KeyError(word)
+        return self.sorted_word_ids[position]
+
+    def __iter__(self):
+        return iter(self.words)
+
+    def __len__(self):
+        return len(self.words)
+
+
+class _MappedPostings(Mapping):
+    # The posting list of each token, as slices of the mapped postings array.
+    def __init__(self, tokens, token_offsets, postings):
+        self.token_ids = {token: token_id for token_id, token in enumerate(tokens)}
+        self.token_offsets = token_offsets
+        self.postings = postings
+
+    def __getitem__(self, token):
+        token_id = self.token_ids[token]
+        return self.postings[self.token_offsets[token_id]:self.token_offsets[token_id + 1]]
+
+    def __iter__(self):
+        return iter(self.token_ids)
+
+    def __len__(self):
+        return len(self.token_ids)
+
+
+class MappedCorpus(Corpus):
+    """
+    A Corpus read from an index file (see write_index_file) through mmap.
+    The headwords, the definitions, the flattened definitions, their offsets and the posting lists are read in
+    place (zero-copy), so loading it takes milliseconds, and the pages are shared through the OS page cache among
+    all the processes that open the file. The strings are only decoded when they are accessed, and the words are
+    looked up by binary search.
+    """
+    def __init__(self, index_file):
+        """
+        Args:
+            index_file (str): The path of the file.
+
+        Raises:
+            IndexFileError: If the file is not an index file, or it was built by another version or platform.
+        """
+        with open(index_file, "rb") as file:
+            # It is checked before mapping it, since an empty file can not be mapped.
+            if os.fstat(file.fileno()).st_size < PREAMBLE.size:
+                raise IndexFileError(f"'{index_file}' is not an index file")
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        buffer = memoryview(self._mmap)
+        magic, version, header_length = PREAMBLE.unpack_from(buffer)
+        if magic != INDEX_FILE_MAGIC:
+            raise IndexFileError(f"'{index_file}' is not an index file")
+        if version != INDEX_FILE_VERSION:
+            raise IndexFileError(f"'{index_file}' has version {version}, expected {INDEX_FILE_VERSION}")
+
+        header = json.loads(bytes(buffer[PREAMBLE.size:PREAMBLE.size + header_length]))
+        if header["byteorder"] != sys.byteorder:
+            raise IndexFileError(f"'{index_file}' was built on a {header['byteorder']} endian platform")
+
+        data_start = PREAMBLE.size + header_length
+        sections = dict()
+        for name, typecode in SECTIONS:
+            offset, length = header["sections"][name]
+            section = buffer[data_start + offset:data_start + offset + length]
+            sections[name] = section.cast(typecode) if typecode is not None else section
+
+        self.words = StringTable(sections["words"], sections["headword_offsets"])
+        self.word_ids = _MappedWordIds(self.words, sections["sorted_word_ids"])
+        self.letter_ranges = {letter: (start, end) for letter, start, end in header["letter_ranges"]}
+        self.word_offsets = sections["word_offsets"]
+        self.definition_offsets = sections["definition_offsets"]
+        self.owners = sections["owners"]
+        self._blob = sections["definitions"]
+        self._flattened_definitions = StringTable(
+            sections["flattened_definitions"], sections["flattened_definition_offsets"]
+        )
+        self.definition_owners = _DefinitionOwners(self)
+        self._sections = sections
+
+    def token_index(self, flattened_definitions):
+        """
+        Args:
+            flattened_definitions (Sequence): The flattened definitions of the corpus.
+
+        Returns:
+            TokenIndex: The token index stored in the file.
+        """
+        tokens = str(self._sections["tokens"], "utf-8").split("\n") if len(self._sections["tokens"]) else list()
+        postings = _MappedPostings(tokens, self._sections["token_offsets"], self._sections["postings"])
+        return TokenIndex(flattened_definitions, postings=postings)
@@ -0,0 +1,169 @@
+import re
+
+from code.search_engine.fuzzy import edit_distance
+from code.search_engine.index import PrefixIndex
+from code.search_engine.query import matches, positive_terms
+from code.search_engine.ranking import BM25Ranker
+from code.search_engine.search_engine import SearchEngine
+from code.utils import Formatter, HashableDict, LRUCache
+
+
+class LazySearchEngine(SearchEngine):
+    """
+    A SearchEngine over lazily loaded definitions (see cache_manager.lazy_definitions), without any index.
+
+    The direct search, the suggestions and the autocompletion only load the letter of the query,
+    and the inverse searches (also ranked, lazy, advanced, by pattern and in batch) stream the letters one by one,
+    so a bounded number of letters is held in memory at any time.
+    The suggestions are the closest words that start with the same letter as the query.
+    The similarity search is not supported, it needs the model of the whole dictionary.
+    """
+    LAZY_MODE = "lazy"
+    MAX_SUGGESTION_DISTANCE = 2
+
+    def __init__(self, definitions, formatter=None, cache_size=None):
+        if cache_size is None:
+            cache_size = self.DEFAULT_CACHE_SIZE
+
+        self.definitions = definitions
+        self.with_definitions = False
+        self.formatter = formatter if formatter is not None else Formatter("console")
+        self.mode = self.LAZY_MODE
+        self.cache = LRUCache(cache_size)
+
+    def set_definitions(self, new_definitions):
+        # If the system reloads the definitions in runtime.
+        self.definitions = new_definitions
+        self.cache.clear()
+
+    def close(self):
+        # There is nothing to release, the letters are loaded on demand.
+        pass
+
+    def similar(self, query, limit=10, with_defs=None, raw=False):
+        return list()
+
+    def suggest(self, query, limit=5):
+        flattened_query = Formatter.flatten_text(query)
+        letter_words = self.definitions.get(self.definitions.letter_of(query), dict())
+        suggestions = list()
+        for word in letter_words:
+            if abs(len(word) - len(flattened_query)) > self.MAX_SUGGESTION_DISTANCE:
+                continue
+            distance = edit_distance(flattened_query, Formatter.flatten_text(word), self.MAX_SUGGESTION_DISTANCE)
+            if distance <= self.MAX_SUGGESTION_DISTANCE:
+                suggestions.append((distance, word))
+        suggestions.sort()
+        if suggestions:
+            # Only the closest words, like the SymSpellIndex does.
+            suggestions = list(item for item in suggestions if item[0] == suggestions[0][0])
+        return list(word for _, word in suggestions[:limit])
+
+    def complete(self, prefix, limit=10):
+        letter_words = self.definitions.get(self.definitions.letter_of(prefix), dict())
+        return PrefixIndex(letter_words).complete(prefix, limit=limit)
+
+    def _word_entry(self, word):
+        return HashableDict({"word": word, "definitions": self.definitions[self.definitions.letter_of(word)][word]})
+
+    def _matching_entries(self, is_match):
+        # The words with a flattened definition that matches, streaming the letters.
+        for letter in self.definitions:
+            for word, definitions in self.definitions[letter].items():
+                if any(map(is_match, map(Formatter.flatten_text, definitions))):
+                    yield HashableDict({"word": word, "definitions": definitions})
+
+    def _get_results(self, search_terms):
+        return set(self._iter_results(search_terms))
+
+    def _iter_results(self, search_terms):
+        flattened_terms = list(Formatter.flatten_text(term) for term in search_terms)
+        return self._matching_entries(
+            lambda flattened_definition: all(term in flattened_definition for term in flattened_terms)
+        )
+
+    def _get_ranked_results(self, search_terms, limit):
+        flattened_terms = list(Formatter.flatten_text(term) for term in search_terms)
+        distinct_terms = len(set(flattened_terms))
+        # The definitions that contain all the terms.
+        return self._rank_matching_definitions(
+            flattened_terms, lambda _, matched_terms: len(matched_terms) == distinct_terms, limit
+        )
+
+    def _get_advanced_results(self, query_tree, limit):
+        if limit is None:
+            return set(self._matching_entries(lambda flattened_definition: matches(query_tree, flattened_definition)))
+        return self._rank_matching_definitions(
+            positive_terms(query_tree),
+            lambda flattened_definition, _: matches(query_tree, flattened_definition),
+            limit
+        )
+
+    def _get_pattern_results(self, pattern):
+        # Each definition is matched on its own, so ^ and $ match its beginning and its end.
+        compiled_pattern = re.compile(pattern, re.MULTILINE)
+        return set(
+            self._matching_entries(lambda flattened_definition: compiled_pattern.search(flattened_definition))
+        )
+
+    def _get_many_results(self, queries_terms):
+        # The letters are streamed once for all the queries.
+        batch_results = list(set() for _ in queries_terms)
+        for letter in self.definitions:
+            for word, definitions in self.definitions[letter].items():
+                flattened_definitions = list(map(Formatter.flatten_text, definitions))
+                entry = None
+                for results, query_terms in zip(batch_results, queries_terms):
+                    if any(
+                            all(term in flattened_definition for term in query_terms)
+                            for flattened_definition in flattened_definitions
+                    ):
+                        entry = entry or HashableDict({"word": word, "definitions": definitions})
+                        results.add(entry)
+        return batch_results
+
+    def _rank_matching_definitions(self, terms, is_match, limit):
+        """
+        The letters are streamed once, counting the BM25 statistics of the whole dictionary
+        (number of definitions, their average length and the document frequency of each term)
+        and keeping only the matching definitions, that are scored at the end.
+
+        Args:
+            terms (iterable): The flattened terms that score the definitions.
+            is_match (callable): It tells if a flattened definition matches, given the terms it contains.
+            limit (int): The maximum number of results.
+
+        Returns:
+            list: The best results, ordered by relevance.
+        """
+        total_definitions = 0
+        total_length = 0
+        document_frequencies = dict.fromkeys(terms, 0)
+        matching_definitions = list()
+        owners = list()
+        entries = list()
+        for letter in self.definitions:
+            for word, definitions in self.definitions[letter].items():
+                entry = None
+                for flattened_definition in map(Formatter.flatten_text, definitions):
+                    total_definitions += 1
+                    total_length += len(flattened_definition.split())
+                    matched_terms = list(term for term in document_frequencies if term in flattened_definition)
+                    for term in matched_terms:
+                        document_frequencies[term] += 1
+                    if is_match(flattened_definition, matched_terms):
+                        if entry is None:
+                            entry = HashableDict({"word": word, "definitions": definitions})
+                            entries.append(entry)
+                        matching_definitions.append(flattened_definition)
+                        owners.append(len(entries) - 1)
+
+        average_length = total_length / total_definitions if total_definitions else 0.0
+        ranker = BM25Ranker(
+            matching_definitions, owners, list(entry["word"] for entry in entries), average_length=average_length
+        )
+        term_weights = {
+            term: ranker.idf(document_frequency, total_definitions=total_definitions)
+            for term, document_frequency in document_frequencies.items()
+        }
+        return list(entries[owner] for owner in ranker.top_k(range(len(matching_definitions)), term_weights, limit))
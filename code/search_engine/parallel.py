@@ -0,0 +1,90 @@
+# Multi-core search over letter shards
+import heapq
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from code.search_engine.index import TokenIndex
+
+# Shard resident in each worker process: its index and the global id of each of its definitions.
+_shard_index = None
+_shard_ids = None
+
+
+def _load_shard(flattened_definitions, global_ids):
+    global _shard_index, _shard_ids
+    _shard_index = TokenIndex(flattened_definitions)
+    _shard_ids = global_ids
+
+
+def _shard_candidates(search_terms):
+    return list(_shard_ids[definition_id] for definition_id in _shard_index.candidates(search_terms))
+
+
+class ShardedSearch:
+    """
+    It splits the definitions in shards of whole letters, balanced by number of definitions, and keeps each shard
+    indexed in its own worker process. The shards are sent once when the workers start, so each query only sends
+    the search terms and receives the matching definition ids.
+    """
+    def __init__(self, flattened_definitions, letter_ranges, workers=None):
+        """
+        Args:
+            flattened_definitions (Sequence): All the flattened definitions.
+            letter_ranges (list): The (start, end) range of definition ids of each letter.
+            workers (int, optional): The number of worker processes. By default, the number of cores.
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = max(1, min(workers, len(letter_ranges)))
+
+        # Greedy balancing: the biggest letters first, each one to the least loaded shard.
+        shards = list((0, shard_number, list()) for shard_number in range(workers))
+        for start, end in sorted(letter_ranges, key=lambda letter_range: letter_range[0] - letter_range[1]):
+            size, shard_number, ranges = heapq.heappop(shards)
+            ranges.append((start, end))
+            heapq.heappush(shards, (size + end - start, shard_number, ranges))
+
+        self.executors = list()
+        for _, _, ranges in shards:
+            global_ids = array("I", (definition_id for start, end in ranges for definition_id in range(start, end)))
+            shard_definitions = list(flattened_definitions[definition_id] for definition_id in global_ids)
+            executor = ProcessPoolExecutor(max_workers=1, initializer=_load_shard,
+                                           initargs=(shard_definitions, global_ids))
+            self.executors.append(executor)
+
+        # The workers are started (and their shards indexed) now, instead of on the first query.
+        for future in list(executor.submit(len, "") for executor in self.executors):
+            future.result()
+
+    def candidates(self, search_terms):
+        """
+        It fans the search out to every shard and merges the results.
+
+        Args:
+            search_terms (list): The flattened search terms.
+
+        Returns:
+            set: The ids of the definitions matching all the search terms.
+        """
+        futures = list(executor.submit(_shard_candidates, search_terms) for executor in self.executors)
+        results = set()
+        for future in futures:
+            results.update(future.result())
+        return results
+
+    def iter_candidates(self, search_terms):
+        """
+        The same as candidates, in order. The shards answer all at once, so it is not lazy.
+
+        Args:
+            search_terms (list): The flattened search terms.
+
+        Yields:
+            int: The ids of the definitions matching all the search terms, in ascending order.
+        """
+        yield from sorted(self.candidates(search_terms))
+
+    def shutdown(self):
+        for executor in self.executors:
+            executor.shutdown(wait=False, cancel_futures=True)
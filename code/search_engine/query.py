@@ -0,0 +1,204 @@
+# Boolean and phrase query language for the inverse search
+import re
+
+from code.utils import Formatter
+
+TERM = "term"
+PHRASE = "phrase"
+NOT = "not"
+AND = "and"
+OR = "or"
+
+OPERATORS = {"AND": AND, "OR": OR, "NOT": NOT, "|": OR}
+TOKEN_REGEX = re.compile(
+    r'"(?P<phrase>[^"]*)"?|(?P<open>\()|(?P<close>\))|(?P<negation>-)(?=[^\s,])|(?P<word>[^\s,()"]+)'
+)
+
+
+class QuerySyntaxError(Exception):
+    def __init__(self, message):
+        self.message = message
+
+    def __str__(self):
+        return self.message
+
+
+def _tokenize(query):
+    tokens = list()
+    for match in TOKEN_REGEX.finditer(query):
+        kind = match.lastgroup
+        if kind == "phrase":
+            tokens.append((PHRASE, Formatter.flatten_text(match.group("phrase")).strip()))
+        elif kind == "word" and match.group("word") in OPERATORS:
+            tokens.append((OPERATORS[match.group("word")], None))
+        elif kind == "word":
+            tokens.append((TERM, Formatter.flatten_text(match.group("word"))))
+        elif kind == "negation":
+            tokens.append((NOT, None))
+        else:
+            tokens.append((kind, None))
+    return tokens
+
+
+def parse_query(query):
+    """
+    It parses a query of the inverse search language into a tree of tuples:
+        - Terms are matched as in the simple search. Commas and whitespaces separate them.
+        - "Quoted phrases" must appear literally in the definition.
+        - NOT term or -term excludes the definitions with the term.
+        - OR or | matches any of both sides.
+        - AND, or just a whitespace between terms, matches both sides. It binds stronger than OR.
+        - Parentheses group expressions.
+
+    Args:
+        query (str): The query to parse.
+
+    Returns:
+        tuple: The query tree. Each node is a tuple with its kind and its term or children.
+
+    Raises:
+        QuerySyntaxError: If the query is malformed.
+    """
+    tokens = _tokenize(query)
+    position = 0
+
+    def peek():
+        return tokens[position][0] if position < len(tokens) else None
+
+    def parse_or():
+        nonlocal position
+        children = [parse_and()]
+        while peek() == OR:
+            position += 1
+            if peek() in (None, "close"):
+                raise QuerySyntaxError("Se esperaba un término después de OR.")
+            children.append(parse_and())
+        return children[0] if len(children) == 1 else (OR, tuple(children))
+
+    def parse_and():
+        nonlocal position
+        children = list()
+        while peek() not in (None, OR, "close"):
+            if peek() == AND:
+                position += 1
+                continue
+            children.append(parse_not())
+        if not children and peek() is not None:
+            raise QuerySyntaxError("Se esperaba un término.")
+        return children[0] if len(children) == 1 else (AND, tuple(children))
+
+    def parse_not():
+        nonlocal position
+        if peek() == NOT:
+            position += 1
+            if peek() in (None, OR, AND, "close"):
+                raise QuerySyntaxError("Se esperaba un término después de la negación.")
+            return NOT, parse_not()
+        return parse_atom()
+
+    def parse_atom():
+        nonlocal position
+        kind, value = tokens[position]
+        position += 1
+        if kind == "open":
+            node = parse_or()
+            if peek() != "close":
+                raise QuerySyntaxError("Falta cerrar un paréntesis.")
+            position += 1
+            return node
+        return kind, value
+
+    tree = parse_or()
+    if position < len(tokens):
+        raise QuerySyntaxError("Sobra un paréntesis de cierre.")
+    return tree
+
+
+def positive_terms(tree):
+    """
+    Returns:
+        set: The terms and phrases of the query tree that are not negated.
+    """
+    kind, value = tree
+    if kind in (TERM, PHRASE):
+        return {value}
+    if kind == NOT:
+        return set()
+    return set().union(*(positive_terms(child) for child in value))
+
+
+def matches(tree, flattened_definition):
+    """
+    It evaluates a query tree against a single flattened definition, like the QueryEvaluator does with all of them.
+
+    Returns:
+        bool: If the definition matches the query.
+    """
+    kind, value = tree
+    if kind in (TERM, PHRASE):
+        return value in flattened_definition
+    if kind == NOT:
+        return not matches(value, flattened_definition)
+    if kind == OR:
+        return any(matches(child, flattened_definition) for child in value)
+    return all(matches(child, flattened_definition) for child in value)
+
+
+class QueryEvaluator:
+    """
+    It evaluates a query tree as set operations over the ids of the matching definitions.
+    """
+    def __init__(self, matching_definitions, flattened_definitions):
+        """
+        Args:
+            matching_definitions (callable): It returns the ids of the definitions that contain all the given terms.
+            flattened_definitions (Sequence): All the flattened definitions.
+        """
+        self.matching_definitions = matching_definitions
+        self.flattened_definitions = flattened_definitions
+
+    def _universe(self):
+        return set(range(len(self.flattened_definitions)))
+
+    def evaluate(self, tree):
+        """
+        Args:
+            tree (tuple): The parsed query.
+
+        Returns:
+            set: The ids of the definitions matching the query.
+        """
+        kind, value = tree
+        if kind == TERM:
+            return self.matching_definitions([value])
+        if kind == PHRASE:
+            candidates = self.matching_definitions(value.split())
+            return set(
+                definition_id for definition_id in candidates if value in self.flattened_definitions[definition_id]
+            )
+        if kind == OR:
+            return set().union(*(self.evaluate(child) for child in value))
+        if kind == NOT:
+            return self._universe() - self.evaluate(value)
+        return self._evaluate_and(value)
+
+    def _evaluate_and(self, children):
+        # The plain terms are resolved together, so the index intersects them smallest first,
+        # and the negations are subtracted from the result instead of being complemented.
+        terms = list(child[1] for child in children if child[0] == TERM)
+        negations = list(child[1] for child in children if child[0] == NOT)
+        others = list(child for child in children if child[0] not in (TERM, NOT))
+
+        results = self.matching_definitions(terms) if terms else None
+        for child in others:
+            if results is not None and len(results) == 0:
+                return results
+            results = self.evaluate(child) if results is None else results & self.evaluate(child)
+
+        if results is None:
+            results = self._universe()
+        for negation in negations:
+            if len(results) == 0:
+                break
+            results -= self.evaluate(negation)
+        return results
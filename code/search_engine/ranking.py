@@ -0,0 +1,116 @@
+# Relevance ranking
+import heapq
+from array import array
+from math import log
+
+
+class _RankedWord:
+    # A word kept in the heap of the best words, where the worst one (lowest score, last alphabetically) is the root.
+    __slots__ = ("score", "word", "owner")
+
+    def __init__(self, score, word, owner):
+        self.score = score
+        self.word = word
+        self.owner = owner
+
+    def __lt__(self, other):
+        return self.score < other.score or (self.score == other.score and self.word > other.word)
+
+
+class BM25Ranker:
+    """
+    It scores the definitions matching a query with the Okapi BM25 function over the definitions corpus,
+    and keeps only the best 'k' words in a bounded heap.
+
+    A word is scored with the best score of its definitions.
+    A term can add less than its weight * (K1 + 1) to a score, so once the heap is full the terms of a definition
+    are scored from the highest weight down, and the definition is dropped as soon as the rest of its terms could
+    not lift it over the worst word kept. When not even a perfect definition could, the ranking stops.
+    """
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, flattened_definitions, definition_owners, owner_words, average_length=None):
+        """
+        Args:
+            flattened_definitions (Sequence): The flattened definitions to be scored.
+            definition_owners (Sequence): The owner id of each definition. The definitions of an owner are contiguous.
+            owner_words (Sequence): The word of each owner id, that breaks the ties.
+            average_length (float, optional): The average length of the definitions of the corpus,
+                                              if they are only a part of it.
+        """
+        self.flattened_definitions = flattened_definitions
+        self.definition_owners = definition_owners
+        self.owner_words = owner_words
+        self.lengths = array("I", (len(definition.split()) for definition in flattened_definitions))
+        if average_length is None:
+            average_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+        self.average_length = average_length
+
+    def idf(self, document_frequency, total_definitions=None):
+        if total_definitions is None:
+            total_definitions = len(self.flattened_definitions)
+        return log(1 + (total_definitions - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def top_k(self, definition_ids, term_weights, limit):
+        """
+        It ranks the matching definitions and returns the best words.
+
+        Args:
+            definition_ids (iterable): The definitions that match the query.
+            term_weights (dict): The idf of each flattened search term.
+            limit (int): The maximum number of words to return.
+
+        Returns:
+            list: The owner ids of the best scored words, ordered by relevance. Ties are ordered alphabetically.
+        """
+        if limit <= 0:
+            return list()
+
+        terms = sorted(term_weights.items(), key=lambda item: item[1], reverse=True)
+        # The maximum score that the terms from each position on can add.
+        remaining_bounds = [0.0] * (len(terms) + 1)
+        for position in range(len(terms) - 1, -1, -1):
+            remaining_bounds[position] = remaining_bounds[position + 1] + terms[position][1] * (self.K1 + 1)
+
+        best_words = list()
+        owner, owner_score = None, None
+        for definition_id in sorted(definition_ids):
+            if self.definition_owners[definition_id] != owner:
+                if owner_score is not None:
+                    self._keep(best_words, owner, owner_score, limit)
+                owner, owner_score = self.definition_owners[definition_id], None
+                if len(best_words) == limit and remaining_bounds[0] < best_words[0].score:
+                    break
+
+            # The score to beat: the best definition of the word, or the worst word kept.
+            floor = best_words[0].score if len(best_words) == limit else -1.0
+            if owner_score is not None and owner_score > floor:
+                floor = owner_score
+
+            definition = self.flattened_definitions[definition_id]
+            length_normalization = self.K1 * (1 - self.B + self.B * self.lengths[definition_id] / self.average_length)
+            score = 0.0
+            for position, (term, weight) in enumerate(terms):
+                if score + remaining_bounds[position] < floor:
+                    break
+                term_frequency = definition.count(term) if term else 1
+                score += weight * term_frequency * (self.K1 + 1) / (term_frequency + length_normalization)
+            else:
+                if owner_score is None or score > owner_score:
+                    owner_score = score
+        else:
+            if owner_score is not None:
+                self._keep(best_words, owner, owner_score, limit)
+
+        return list(ranked_word.owner for ranked_word in sorted(best_words, reverse=True))
+
+    def _keep(self, best_words, owner, score, limit):
+        # It pushes the word into the heap of the best words, if it is better than the worst one when it is full.
+        if len(best_words) == limit and score < best_words[0].score:
+            return
+        ranked_word = _RankedWord(score, self.owner_words[owner], owner)
+        if len(best_words) < limit:
+            heapq.heappush(best_words, ranked_word)
+        elif best_words[0] < ranked_word:
+            heapq.heapreplace(best_words, ranked_word)
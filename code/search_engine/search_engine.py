@@ -1,4 +1,14 @@
-from utils import HashableDict, Formatter
+from functools import cached_property
+
+from code.search_engine.corpus import Corpus
+from code.search_engine.fuzzy import SymSpellIndex
+from code.search_engine.index import BufferScan, PrefixIndex, TokenIndex, TrigramIndex
+from code.search_engine.index_file import MappedCorpus
+from code.search_engine.parallel import ShardedSearch
+from code.search_engine.query import PHRASE, QueryEvaluator, parse_query, positive_terms
+from code.search_engine.ranking import BM25Ranker
+from code.search_engine.similarity import TfIdfSimilarity
+from utils import Formatter, LRUCache
 
 
 # Where the searching stuff goes on
@@ -6,33 +16,141 @@ class SearchEngine:
     """
     With all the information loaded into the system, the SearchEngine is the responsible of
     the direct and inverse search into the dictionary.
+
+    The inverse search can be done in these modes:
+        - scan: It checks every definition of the dictionary for each query. Used as reference.
+        - index: It resolves the query over an inverted index of the definition tokens.
+        - trigram: It narrows the query down with a character trigram index and verifies the candidates.
+        - buffer: It scans all the flattened definitions concatenated in a single string, with C-level searches.
+        - parallel: It splits the dictionary in letter shards, indexed in worker processes, and searches all of them
+                    at the same time.
+
+    The results can also be ranked by relevance (BM25), keeping only the best ones.
+    The advanced search accepts a query language with AND, OR, NOT (or -term) and "quoted phrases".
+    The results of the latest queries are kept in a LRU cache, that is emptied when the definitions change.
+    The direct search suggests the closest words when the query is not in the dictionary.
+    The words can be autocompleted from their beginning.
+    The similarity search ranks the words whose definitions have a similar meaning to a description (TF-IDF),
+    even if the description terms do not appear literally in them.
+
+    The flattened definitions that the search works with are the ones held by the corpus (see Corpus), so the
+    engine does not keep another copy of the dictionary.
+    The structures that only some features use (ranking, suggestions, autocompletion and similarity) are built
+    the first time they are needed. With a prebuilt index file (see from_index_file) the definitions and the
+    token index are mapped from disk, so the engine is ready in a few milliseconds.
     """
+    LAZY_STRUCTURES = ("ranker", "fuzzy_index", "prefix_index", "similarity")
+    DEFAULT_CACHE_SIZE = 256
+
+    SCAN_MODE = "scan"
+    INDEX_MODE = "index"
+    TRIGRAM_MODE = "trigram"
+    BUFFER_MODE = "buffer"
+    PARALLEL_MODE = "parallel"
+    VALID_MODES = {SCAN_MODE, INDEX_MODE, TRIGRAM_MODE, BUFFER_MODE, PARALLEL_MODE}
+    INDEXES = {INDEX_MODE: TokenIndex, TRIGRAM_MODE: TrigramIndex, BUFFER_MODE: BufferScan}
+
     @staticmethod
     def _load_definitions(data):
-        definition_dict = dict()
-
-        for letter, words in data.items():
-            for word, definitions in words.items():
-                word_object = HashableDict({
-                    "word": word,
-                    "definitions": definitions
-                })
-                definition_dict[word] = word_object
-        return definition_dict
-
-    def __init__(self, definitions, formatter=None):
+        # A corpus is used as is, so it can be shared without holding another copy of the definitions.
+        if isinstance(data, Corpus):
+            return data
+        return Corpus(data)
+
+    def _setup(self):
+        functions = {
+            self.SCAN_MODE: self._get_results_scan,
+            self.INDEX_MODE: self._get_results_index,
+            self.TRIGRAM_MODE: self._get_results_index,
+            self.BUFFER_MODE: self._get_results_index,
+            self.PARALLEL_MODE: self._get_results_index
+        }
+
+        self._get_results = functions[self.mode]
+        self.index = None
+        self._build_index()
+
+    def _build_index(self):
+        if self.mode == self.PARALLEL_MODE and self.index is not None:
+            self.index.shutdown()
+
+        self.index = None
+        self._buffer_scan = None
+        for structure in self.LAZY_STRUCTURES:
+            self.__dict__.pop(structure, None)
+        self._definition_owners = self.definitions.definition_owners
+        self._flattened_definitions = self.definitions.flattened_definitions()
+
+        if self.mode == self.INDEX_MODE and isinstance(self.definitions, MappedCorpus):
+            # The token index is already built in the index file.
+            self.index = self.definitions.token_index(self._flattened_definitions)
+        elif self.mode in self.INDEXES:
+            self.index = self.INDEXES[self.mode](self._flattened_definitions)
+        elif self.mode == self.PARALLEL_MODE:
+            letter_ranges = list(self.definitions.definition_ranges().values())
+            self.index = ShardedSearch(self._flattened_definitions, letter_ranges, workers=self.workers)
+
+    def __init__(self, definitions, formatter=None, mode=None, cache_size=None, workers=None):
+        if mode is None:
+            mode = self.INDEX_MODE
+        if cache_size is None:
+            cache_size = self.DEFAULT_CACHE_SIZE
+        if mode not in self.VALID_MODES:
+            raise Exception(f"Search mode '{mode}' not supported")
+
         self.definitions = self._load_definitions(definitions)
         self.with_definitions = False
         self.formatter = formatter if formatter is not None else Formatter("console")
+        self.mode = mode
+        self.workers = workers
+        self.cache = LRUCache(cache_size)
+        self._setup()
+
+    @classmethod
+    def from_index_file(cls, index_file, formatter=None, mode=None, cache_size=None, workers=None):
+        """
+        Args:
+            index_file (str): The path of an index file (see index_file.write_index_file).
+
+        Returns:
+            SearchEngine: A search engine over the definitions mapped from the index file.
+
+        Raises:
+            IndexFileError: If the file is not a valid index file.
+        """
+        return cls(MappedCorpus(index_file), formatter=formatter, mode=mode, cache_size=cache_size, workers=workers)
+
+    @cached_property
+    def ranker(self):
+        return BM25Ranker(self._flattened_definitions, self.definitions.owners, self.definitions.words)
+
+    @cached_property
+    def fuzzy_index(self):
+        return SymSpellIndex(self.definitions.words)
+
+    @cached_property
+    def prefix_index(self):
+        return PrefixIndex(self.definitions.words)
+
+    @cached_property
+    def similarity(self):
+        return TfIdfSimilarity(self._flattened_definitions, self.definitions.word_offsets)
 
     def set_definitions(self, new_definitions):
         # If the system reloads the definitions in runtime.
         self.definitions = self._load_definitions(new_definitions)
+        self._build_index()
+        self.cache.clear()
 
     def set_with_definitions(self, new_with_definitions):
         self.with_definitions = new_with_definitions
 
-    def search(self, query, sep=None, with_defs=None, raw=False):
+    def close(self):
+        # It stops the worker processes of the parallel mode, once the engine is no longer used.
+        if self.mode == self.PARALLEL_MODE and self.index is not None:
+            self.index.shutdown()
+
+    def search(self, query, sep=None, with_defs=None, raw=False, limit=None):
         """
         The inverse search method.
         Here we retrieve all the information and return the formatted results
@@ -41,6 +159,8 @@ class SearchEngine:
             sep (str, optional): A separator for the query terms.
             with_defs (bool, optional): If true, it returns the results with the definitions, else only the words.
             raw (bool, optional): If true, the formatter will not take effect.
+            limit (int, optional): If provided, only the 'limit' most relevant results are returned, ordered by
+                                   relevance. Else, all the results are returned unordered.
 
         Returns:
             list: The formatted word results.
@@ -51,10 +171,269 @@ class SearchEngine:
         if sep is None:
             sep = " "
 
+        search_terms = Formatter.flatten_text(query, sep=sep).split(sep)
+        # The terms are ANDed, so neither their order, repetitions nor empty terms change the results.
+        cache_key = ("terms", tuple(sorted(set(term for term in search_terms if term))), with_defs, raw, limit)
+        if (cached_results := self.cache.get(cache_key)) is not None:
+            return list(cached_results)
+
+        if limit is None:
+            results = self._get_results(search_terms)
+        else:
+            results = self._get_ranked_results(search_terms, limit)
+
+        formatted_results = list(self.formatter.format_word(result, with_defs=with_defs, raw=raw) for result in results)
+        self.cache.put(cache_key, formatted_results)
+        return list(formatted_results)
+
+    def search_many(self, queries, sep=None, with_defs=None, raw=False):
+        """
+        The batch inverse search method.
+        All the queries are normalized up front and each distinct term is matched against the dictionary only once,
+        sharing its matching definitions among all the queries that use it.
+
+        Args:
+            queries (iterable): The search queries.
+            sep (str, optional): A separator for the query terms.
+            with_defs (bool, optional): If true, it returns the results with the definitions, else only the words.
+            raw (bool, optional): If true, the formatter will not take effect.
+
+        Returns:
+            list: The formatted word results of each query, in the same order as the queries.
+        """
+        if with_defs is None:
+            with_defs = self.with_definitions
+
+        if sep is None:
+            sep = " "
+
+        queries_terms = list(
+            set(term for term in Formatter.flatten_text(query, sep=sep).split(sep) if term) for query in queries
+        )
+        return list(
+            list(self.formatter.format_word(result, with_defs=with_defs, raw=raw) for result in results)
+            for results in self._get_many_results(queries_terms)
+        )
+
+    def _get_many_results(self, queries_terms):
+        """
+        The batch inverse search logic.
+
+        Args:
+            queries_terms (list): The set of distinct flattened terms of each query.
+
+        Returns:
+            list: The results of each query.
+        """
+        term_matches = self._match_terms(set().union(*queries_terms))
+
+        all_definitions = None
+        batch_results = list()
+        for query_terms in queries_terms:
+            if query_terms:
+                matches = sorted((term_matches[term] for term in query_terms), key=len)
+                definition_ids = matches[0].intersection(*matches[1:])
+            else:
+                if all_definitions is None:
+                    all_definitions = frozenset(range(len(self._flattened_definitions)))
+                definition_ids = all_definitions
+            batch_results.append(set(self._definition_owners[definition_id] for definition_id in definition_ids))
+        return batch_results
+
+    def _match_terms(self, flattened_terms):
+        """
+        Args:
+            flattened_terms (set): The distinct flattened search terms.
+
+        Returns:
+            dict: The ids of the definitions that contain each term.
+        """
+        if self.index is not None:
+            return {term: frozenset(self.index.candidates([term])) for term in flattened_terms}
+
+        # Without index, a single pass over the definitions checks all the terms.
+        term_matches = {term: list() for term in flattened_terms}
+        for definition_id, definition in enumerate(self._flattened_definitions):
+            for term, matches in term_matches.items():
+                if term in definition:
+                    matches.append(definition_id)
+        return {term: frozenset(matches) for term, matches in term_matches.items()}
+
+    def advanced_search(self, query, with_defs=None, raw=False, limit=None):
+        """
+        The inverse search method for the query language (see parse_query).
+        The query is parsed once and evaluated with set operations over the matching definitions.
+
+        Args:
+            query (str): The search query.
+            with_defs (bool, optional): If true, it returns the results with the definitions, else only the words.
+            raw (bool, optional): If true, the formatter will not take effect.
+            limit (int, optional): If provided, only the 'limit' most relevant results are returned, ordered by
+                                   relevance. Else, all the results are returned unordered.
+
+        Returns:
+            list: The formatted word results.
+
+        Raises:
+            QuerySyntaxError: If the query is malformed.
+        """
+        if with_defs is None:
+            with_defs = self.with_definitions
+
+        query_tree = parse_query(query)
+        cache_key = ("advanced", query_tree, with_defs, raw, limit)
+        if (cached_results := self.cache.get(cache_key)) is not None:
+            return list(cached_results)
+
+        results = self._get_advanced_results(query_tree, limit)
+        formatted_results = list(self.formatter.format_word(result, with_defs=with_defs, raw=raw) for result in results)
+        self.cache.put(cache_key, formatted_results)
+        return list(formatted_results)
+
+    def _get_advanced_results(self, query_tree, limit):
+        """
+        The inverse search logic of the query language.
+
+        Args:
+            query_tree (tuple): The parsed query.
+            limit (int): The maximum number of results, or None for all of them unordered.
+
+        Returns:
+            The results that match the query.
+        """
+        evaluator = QueryEvaluator(self._matching_definitions, self._flattened_definitions)
+        definition_ids = evaluator.evaluate(query_tree)
+        if limit is None:
+            return set(self._definition_owners[definition_id] for definition_id in definition_ids)
+
+        # The phrases are resolved like in the query, narrowed down by their words.
+        term_weights = {
+            term: self.ranker.idf(len(evaluator.evaluate((PHRASE, term))))
+            for term in positive_terms(query_tree)
+        }
+        return list(map(self.definitions.entry_at, self.ranker.top_k(definition_ids, term_weights, limit)))
+
+    def search_pattern(self, pattern, with_defs=None, raw=False):
+        """
+        The inverse search method for regular expressions.
+        The pattern is matched against the flattened definitions (lowercase and without accent marks),
+        and ^ and $ match the beginning and the end of each definition.
+
+        Args:
+            pattern (str): The regular expression.
+            with_defs (bool, optional): If true, it returns the results with the definitions, else only the words.
+            raw (bool, optional): If true, the formatter will not take effect.
+
+        Returns:
+            list: The formatted word results.
+
+        Raises:
+            re.error: If the pattern is not a valid regular expression.
+        """
+        if with_defs is None:
+            with_defs = self.with_definitions
+
+        results = self._get_pattern_results(pattern)
+        return list(self.formatter.format_word(result, with_defs=with_defs, raw=raw) for result in results)
+
+    def _get_pattern_results(self, pattern):
+        """
+        The inverse search logic for regular expressions.
+
+        Args:
+            pattern (str): The regular expression.
+
+        Returns:
+            set: The results that match the pattern.
+        """
+        if isinstance(self.index, BufferScan):
+            self._buffer_scan = self.index
+        elif self._buffer_scan is None:
+            self._buffer_scan = BufferScan(self._flattened_definitions)
+
+        return set(
+            self._definition_owners[definition_id] for definition_id in self._buffer_scan.match_pattern(pattern)
+        )
+
+    def similar(self, query, limit=10, with_defs=None, raw=False):
+        """
+        The similarity search method.
+        It ranks all the dictionary by the TF-IDF cosine similarity between the query and the definitions.
+
+        Args:
+            query (str): The description of the concept.
+            limit (int, optional): The maximum number of results.
+            with_defs (bool, optional): If true, it returns the results with the definitions, else only the words.
+            raw (bool, optional): If true, the formatter will not take effect.
+
+        Returns:
+            list: The formatted word results, ordered by similarity.
+        """
+        if with_defs is None:
+            with_defs = self.with_definitions
+
+        return list(
+            self.formatter.format_word(self.definitions.entry_at(word_id), with_defs=with_defs, raw=raw)
+            for word_id in self.similarity.top_k(query, limit)
+        )
+
+    def search_iter(self, query, sep=None, with_defs=None, raw=False):
+        """
+        The lazy inverse search method.
+        The results are matched and produced one by one in a stable order (the dictionary order), so the search
+        stops as soon as the consumer does: the indexes are walked in order (see iter_candidates) instead of
+        collecting all the matches first. Only the parallel mode gets all the matches of its shards at once.
+
+        Args:
+            query (str): The search query.
+            sep (str, optional): A separator for the query terms.
+            with_defs (bool, optional): If true, it returns the results with the definitions, else only the words.
+            raw (bool, optional): If true, the formatter will not take effect.
+
+        Yields:
+            The formatted word results.
+        """
+        if with_defs is None:
+            with_defs = self.with_definitions
+
+        if sep is None:
+            sep = " "
+
         query = Formatter.flatten_text(query, sep=sep)
+        for result in self._iter_results(query.split(sep)):
+            yield self.formatter.format_word(result, with_defs=with_defs, raw=raw)
+
+    def search_page(self, query, offset, size, sep=None, with_defs=None, raw=False):
+        """
+        The paginated inverse search method.
+        The ordered results of the query are kept in the LRU cache, so the next pages of the same query
+        are sliced from them instead of searching again.
+
+        Args:
+            query (str): The search query.
+            offset (int): The number of results to skip.
+            size (int): The maximum number of results of the page.
+            sep (str, optional): A separator for the query terms.
+            with_defs (bool, optional): If true, it returns the results with the definitions, else only the words.
+            raw (bool, optional): If true, the formatter will not take effect.
+
+        Returns:
+            list: The formatted word results of the page.
+        """
+        if with_defs is None:
+            with_defs = self.with_definitions
+
+        if sep is None:
+            sep = " "
+
+        search_terms = Formatter.flatten_text(query, sep=sep).split(sep)
+        # The unformatted results, shared by all the pages and formats of the query.
+        cache_key = ("ordered", tuple(sorted(set(term for term in search_terms if term))))
+        if (results := self.cache.get(cache_key)) is None:
+            results = list(self._iter_results(search_terms))
+            self.cache.put(cache_key, results)
         return list(
-            self.formatter.format_word(result, with_defs=with_defs, raw=raw)
-            for result in self._get_results(query.split(sep))
+            self.formatter.format_word(result, with_defs=with_defs, raw=raw) for result in results[offset:offset + size]
         )
 
     def consult(self, query, sep=None):
@@ -75,13 +454,68 @@ class SearchEngine:
         query_split = query.split(sep=sep)
         try:
             if len(query_split) == 1:
-                return self.formatter.format_word(self.definitions[query])
+                return self.consult_word(query)
         except KeyError:
+            if suggestions := self.suggest(query):
+                return f"No encuentro esa palabra. ¿Quisiste decir {', '.join(suggestions)}?"
             return "No encuentro esa palabra."
 
-    def _get_results(self, search_terms):
+    def consult_word(self, word):
         """
-        The REAL inverse search logic.
+        The direct search method for a headword as it is, like the ones of complete, that can contain spaces.
+
+        Args:
+            word (str): The headword.
+
+        Returns:
+            The formatted word with its definitions.
+
+        Raises:
+            KeyError: If the word is not in the dictionary.
+        """
+        return self.formatter.format_word(self._word_entry(word))
+
+    def suggest(self, query, limit=5):
+        """
+        The typo-tolerant search method.
+        It retrieves the closest words of the dictionary to the query, ignoring accent marks and capital letters.
+
+        Args:
+            query (str): The (probably misspelled) word.
+            limit (int, optional): The maximum number of suggestions.
+
+        Returns:
+            list: The closest words, up to an edit distance of 2.
+        """
+        return self.fuzzy_index.lookup(query, limit=limit)
+
+    def complete(self, prefix, limit=10):
+        """
+        The autocomplete method.
+        It retrieves the words that start with the prefix, ignoring accent marks and capital letters.
+
+        Args:
+            prefix (str): The beginning of the words.
+            limit (int, optional): The maximum number of words.
+
+        Returns:
+            list: The words starting with the prefix, in alphabetical order.
+        """
+        return self.prefix_index.complete(prefix, limit=limit)
+
+    def _word_entry(self, word):
+        """
+        Returns:
+            The word with its definitions, as the formatter expects it.
+
+        Raises:
+            KeyError: If the word is not in the dictionary.
+        """
+        return self.definitions.entry(word)
+
+    def _get_results_scan(self, search_terms):
+        """
+        The REAL inverse search logic, checking every definition of the dictionary.
 
         Args:
             search_terms (list): The search terms.
@@ -91,10 +525,85 @@ class SearchEngine:
         """
         search_results = set()
 
-        for word in self.definitions.values():
+        for word in self.definitions.entries():
             for definition in word["definitions"]:
                 flattened_definition = Formatter.flatten_text(definition)
                 if all(Formatter.flatten_text(term) in flattened_definition for term in search_terms):
                     search_results.add(word)
                     break
         return search_results
+
+    def _get_results_index(self, search_terms):
+        """
+        The inverse search logic over the mode index. It returns the same results as the scan.
+
+        Args:
+            search_terms (list): The search terms.
+
+        Returns:
+            set: The results that matches with the search terms.
+        """
+        flattened_terms = list(Formatter.flatten_text(term) for term in search_terms)
+        return set(
+            self._definition_owners[definition_id] for definition_id in self._matching_definitions(flattened_terms)
+        )
+
+    def _get_ranked_results(self, search_terms, limit):
+        """
+        The ranked inverse search logic.
+
+        Args:
+            search_terms (list): The search terms.
+            limit (int): The maximum number of results.
+
+        Returns:
+            list: The 'limit' best results that matches with the search terms, ordered by relevance.
+        """
+        # The matches of each term give both its document frequency and the matches of the query, so the scan mode
+        # only needs a single pass over the definitions, and the other modes only read the index.
+        term_matches = self._match_terms(set(Formatter.flatten_text(term) for term in search_terms))
+        term_weights = {term: self.ranker.idf(len(matches)) for term, matches in term_matches.items()}
+        matches = sorted(term_matches.values(), key=len)
+        word_ids = self.ranker.top_k(matches[0].intersection(*matches[1:]), term_weights, limit)
+        return list(map(self.definitions.entry_at, word_ids))
+
+    def _iter_results(self, search_terms):
+        """
+        The lazy inverse search logic.
+
+        Args:
+            search_terms (list): The search terms.
+
+        Yields:
+            The results that matches with the search terms, in the dictionary order.
+        """
+        flattened_terms = list(Formatter.flatten_text(term) for term in search_terms)
+        if self.index is None:
+            definition_ids = (
+                definition_id for definition_id, definition in enumerate(self._flattened_definitions)
+                if all(term in definition for term in flattened_terms)
+            )
+        else:
+            definition_ids = self.index.iter_candidates(flattened_terms)
+
+        last_owner = None
+        for definition_id in definition_ids:
+            # The definitions of a word are contiguous, so each word is yielded once.
+            if (owner := self._definition_owners[definition_id]) != last_owner:
+                last_owner = owner
+                yield owner
+
+    def _matching_definitions(self, flattened_terms):
+        """
+        Args:
+            flattened_terms (list): The flattened search terms.
+
+        Returns:
+            set: The ids of the definitions that contain all the search terms.
+        """
+        if self.index is None:
+            return set(
+                definition_id for definition_id, definition in enumerate(self._flattened_definitions)
+                if all(term in definition for term in flattened_terms)
+            )
+        return self.index.candidates(flattened_terms)
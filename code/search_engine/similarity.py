@@ -0,0 +1,82 @@
+# "Similar meaning" search over a TF-IDF model of the definitions
+import re
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from code.utils import Formatter
+
+TOKEN_REGEX = re.compile(r"\w+")
+
+
+class TfIdfSimilarity:
+    """
+    A sparse TF-IDF matrix (definitions x vocabulary) with L2-normalized rows.
+    A query is answered with a single sparse matrix-vector product (the cosine similarity with every definition),
+    and the best words are selected with argpartition, so the whole dictionary is ranked at once.
+
+    A word is scored with the best score of its definitions.
+    """
+    def __init__(self, flattened_definitions, word_offsets):
+        """
+        Args:
+            flattened_definitions (Sequence): All the flattened definitions.
+            word_offsets (array): The id of the first definition of each word, plus the number of definitions.
+        """
+        self.vocabulary = dict()
+        rows = list()
+        columns = list()
+        for definition_id, definition in enumerate(flattened_definitions):
+            for token in TOKEN_REGEX.findall(definition):
+                rows.append(definition_id)
+                columns.append(self.vocabulary.setdefault(token, len(self.vocabulary)))
+
+        shape = (len(flattened_definitions), len(self.vocabulary))
+        term_frequencies = csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, columns)), shape=shape)
+        term_frequencies.sum_duplicates()
+
+        document_frequencies = np.bincount(term_frequencies.indices, minlength=shape[1])
+        self.idf = (np.log((1 + shape[0]) / (1 + document_frequencies)) + 1).astype(np.float32)
+
+        # Sublinear tf, weighted by idf and L2-normalized by rows.
+        term_frequencies.data = (1 + np.log(term_frequencies.data)) * self.idf[term_frequencies.indices]
+        norms = np.sqrt(np.asarray(term_frequencies.multiply(term_frequencies).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        term_frequencies.data /= np.repeat(norms, np.diff(term_frequencies.indptr)).astype(np.float32)
+        self.matrix = term_frequencies
+
+        # Only the words with definitions take part in the per-word reduction of the scores.
+        word_offsets = np.asarray(word_offsets, dtype=np.int64)
+        self.scored_words = np.flatnonzero(word_offsets[1:] > word_offsets[:-1])
+        self.word_starts = word_offsets[self.scored_words]
+
+    def _query_vector(self, query):
+        vector = np.zeros(len(self.vocabulary), dtype=np.float32)
+        for token in TOKEN_REGEX.findall(Formatter.flatten_text(query)):
+            if (column := self.vocabulary.get(token)) is not None:
+                vector[column] += self.idf[column]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def top_k(self, query, limit):
+        """
+        Args:
+            query (str): The description of the concept.
+            limit (int): The maximum number of words to return.
+
+        Returns:
+            list: The ids of the words with the most similar definitions, ordered by similarity.
+        """
+        query_vector = self._query_vector(query)
+        if not query_vector.any() or len(self.word_starts) == 0:
+            return list()
+
+        scores = self.matrix @ query_vector
+        word_scores = np.maximum.reduceat(scores, self.word_starts)
+
+        limit = min(limit, np.count_nonzero(word_scores))
+        if limit == 0:
+            return list()
+        best = np.argpartition(-word_scores, limit - 1)[:limit]
+        best = best[np.lexsort((best, -word_scores[best]))]
+        return list(int(word_id) for word_id in self.scored_words[best])
@@ -0,0 +1,74 @@
+from code.search_engine.search_engine import SearchEngine
+from code.utils import Formatter, HashableDict, LRUCache
+
+
+class SQLiteSearchEngine(SearchEngine):
+    """
+    A SearchEngine that runs against the SQLite database (see cache_manager.database) instead of holding
+    the dictionary in memory, so its memory usage does not depend on the size of the dictionary.
+
+    It supports the direct search, the inverse search (also ranked, advanced, by pattern and in batch) and the
+    autocompletion. The matching words are read with their definitions in a single query.
+    The direct search only suggests the words that differ in accent marks or capital letters.
+    The similarity search is not supported, it needs the model of the whole dictionary.
+    """
+    SQLITE_MODE = "sqlite"
+
+    def __init__(self, database, formatter=None, cache_size=None):
+        if cache_size is None:
+            cache_size = self.DEFAULT_CACHE_SIZE
+
+        self.database = database
+        self.with_definitions = False
+        self.formatter = formatter if formatter is not None else Formatter("console")
+        self.mode = self.SQLITE_MODE
+        self.cache = LRUCache(cache_size)
+
+    def set_definitions(self, new_database):
+        # If the system swaps the database in runtime.
+        self.database = new_database
+        self.cache.clear()
+
+    def close(self):
+        self.database.close()
+
+    def similar(self, query, limit=10, with_defs=None, raw=False):
+        return list()
+
+    def suggest(self, query, limit=5):
+        return self.database.words_like(Formatter.flatten_text(query))[:limit]
+
+    def complete(self, prefix, limit=10):
+        return self.database.complete(Formatter.flatten_text(prefix), limit)
+
+    def _word_entry(self, word):
+        return self._entry(word, self.database.definitions_of(word))
+
+    @staticmethod
+    def _entry(word, definitions):
+        return HashableDict({"word": word, "definitions": definitions})
+
+    def _get_results(self, search_terms):
+        flattened_terms = list(Formatter.flatten_text(term) for term in search_terms)
+        return set(self._entry(word, definitions) for word, definitions in self.database.search(flattened_terms))
+
+    def _get_ranked_results(self, search_terms, limit):
+        flattened_terms = list(Formatter.flatten_text(term) for term in search_terms)
+        results = self.database.search(flattened_terms, limit)
+        return list(self._entry(word, definitions) for word, definitions in results)
+
+    def _iter_results(self, search_terms):
+        flattened_terms = list(Formatter.flatten_text(term) for term in search_terms)
+        for word, definitions in self.database.search(flattened_terms):
+            yield self._entry(word, definitions)
+
+    def _get_advanced_results(self, query_tree, limit):
+        results = self.database.advanced_search(query_tree, limit)
+        results = (self._entry(word, definitions) for word, definitions in results)
+        return set(results) if limit is None else list(results)
+
+    def _get_pattern_results(self, pattern):
+        return set(self._entry(word, definitions) for word, definitions in self.database.pattern_search(pattern))
+
+    def _get_many_results(self, queries_terms):
+        return list(self._get_results(query_terms) for query_terms in queries_terms)
@@ -1,18 +1,28 @@
 import signal
 import sys
-from time import sleep
+from itertools import count
+from threading import Event, Lock, Thread
+from time import perf_counter, sleep
 from uuid import uuid4
 
 from telepot import Bot, glance, message_identifier
 from telepot.api import set_proxy
 from telepot.exception import TelegramError
 from telepot.loop import MessageLoop
+from telepot.namedtuple import InlineQueryResultArticle, InputTextMessageContent
 
-from code.bot.bot_utils import parse_options, inline_keyboard
-from code.bot.bot_config import ADMIN, SLEEP_TIME, BOT_CONFIG_FILE
+from code.bot.backend import SearchBackend, use
+from code.bot.bot_utils import parse_options, inline_keyboard, truncate_message
+from code.bot.bot_config import ADMIN, SLEEP_TIME, BOT_CONFIG_FILE, SEARCH_RESULTS_LIMIT, INLINE_RESULTS_LIMIT, \
+    USE_DATABASE, LAZY_LOADING, MAX_RESIDENT_LETTERS
 from code.bot.stop import stop
+from code.cache_manager.database import Database
 from code.cache_manager.manager import CacheManager
+from code.config import DB_FILE
+from code.search_engine.query import QuerySyntaxError
+from code.search_engine.lazy_search_engine import LazySearchEngine
 from code.search_engine.search_engine import SearchEngine
+from code.search_engine.sqlite_search_engine import SQLiteSearchEngine
 from code.utils import Formatter, load_data, log, safe_execution
 
 
@@ -22,9 +32,100 @@ def signal_handler(sig, frame):
     exit()
 
 
+WARMING_UP_MESSAGE = "Calentando índice… La búsqueda puede tardar un poco más de lo normal."
+
+
+# Staged startup and reloads
+def _build_backend():
+    """
+    It loads the definitions and builds a new search engine, with the configured backend.
+    Nothing is shared with the running ones, so it can be built off to the side while the bot keeps serving.
+
+    Returns:
+        SearchBackend: The new cache manager and search engine.
+    """
+    generation = next(generations)
+    if USE_DATABASE:
+        database = Database(DB_FILE)
+        return SearchBackend(
+            CacheManager(database=database), SQLiteSearchEngine(database, Formatter("bot")), generation
+        )
+    if LAZY_LOADING:
+        new_cache_manager = CacheManager(lazy=True, max_letters=MAX_RESIDENT_LETTERS)
+        return SearchBackend(
+            new_cache_manager, LazySearchEngine(new_cache_manager.definitions, Formatter("bot")), generation
+        )
+    new_cache_manager = CacheManager(compact=True)
+    return SearchBackend(new_cache_manager, SearchEngine(new_cache_manager.definitions, Formatter("bot")), generation)
+
+
+def _swap_backend(new_backend):
+    """
+    It swaps the new backend in, unless a newer one (e.g. a reload that finished before the warm-up) already was.
+    The requests that already took the previous backend finish on it, and then it is closed.
+
+    Returns:
+        bool: If the new backend was swapped in.
+    """
+    global search_backend
+    with swap_lock:
+        if new_backend.generation < search_backend.generation:
+            swapped, old_backend = False, new_backend
+        else:
+            swapped, old_backend, search_backend = True, search_backend, new_backend
+            index_ready.set()
+    old_backend.retire()
+    return swapped
+
+
+def _current_backend():
+    return search_backend
+
+
+@safe_execution(" The bot keeps serving the searches without the index.")
+def _warm_up_index():
+    """
+    It builds the search index in background, while the bot serves the searches from the letter files,
+    and then it swaps the index in.
+    """
+    warm_up_start = perf_counter()
+    if _swap_backend(_build_backend()):
+        log(f"Search index ready in {perf_counter() - warm_up_start:.2f}s", level="INFO")
+    else:
+        log("Search index discarded, the definitions were reloaded meanwhile", level="INFO")
+
+
+@safe_execution(" The bot keeps serving the previous definitions.")
+def _reload_in_background(chat_id):
+    try:
+        reload_start = perf_counter()
+        _swap_backend(_build_backend())
+        reload_time = perf_counter() - reload_start
+        log(f"Definitions reloaded in {reload_time:.2f}s", level="INFO")
+        with use(_current_backend) as backend:
+            bot.sendMessage(
+                chat_id,
+                f"Definiciones recargadas en {reload_time:.1f} segundos: "
+                f"{backend.cache_manager.number_of_words()} palabras y "
+                f"{backend.cache_manager.number_of_definitions()} definiciones."
+            )
+    except Exception:
+        bot.sendMessage(chat_id, "No se han podido recargar las definiciones. Se mantienen las anteriores.")
+        raise
+    finally:
+        reload_lock.release()
+
+
+def _log_first_response():
+    global first_response_time
+    if first_response_time is None:
+        first_response_time = perf_counter() - start_time
+        log(f"Time to first response: {first_response_time:.2f}s", level="INFO")
+
+
 # Command functions
-def _handle_inverse_results(inverse_search_results, current_index):
-    word_content = search_engine.consult(inverse_search_results[current_index])
+def _handle_inverse_results(engine, inverse_search_results, current_index):
+    word_content = engine.consult(inverse_search_results[current_index])
     keyboard = None
 
     if (query_length := len(inverse_search_results)) > 1:
@@ -42,7 +143,47 @@ def _handle_inverse_results(inverse_search_results, current_index):
 
 
 def _inverse_search(chat_id, query):
-    word_results = search_engine.search(query, with_defs=False, raw=True)
+    if not index_ready.is_set():
+        # The slower search over the letter files, until the index is ready.
+        bot.sendMessage(chat_id, WARMING_UP_MESSAGE)
+    # The whole query runs on the same engine, even if another one is swapped in meanwhile.
+    with use(_current_backend) as backend:
+        engine = backend.search_engine
+        word_results = engine.search(query, with_defs=False, raw=True, limit=SEARCH_RESULTS_LIMIT)
+        if len(word_results) == SEARCH_RESULTS_LIMIT:
+            word_results = _with_remaining_results(word_results, engine.search_iter(query, with_defs=False, raw=True))
+        if len(word_results) == 0:
+            word_results = engine.similar(query, limit=SEARCH_RESULTS_LIMIT, with_defs=False, raw=True)
+            if len(word_results) > 0:
+                bot.sendMessage(chat_id, "No hay resultados exactos. Te muestro palabras con un significado parecido.")
+        _send_inverse_results(engine, chat_id, word_results)
+
+
+def _advanced_search(chat_id, query):
+    if not index_ready.is_set():
+        # Like the simple search, it streams the letter files until the index is ready.
+        bot.sendMessage(chat_id, WARMING_UP_MESSAGE)
+    with use(_current_backend) as backend:
+        engine = backend.search_engine
+        try:
+            word_results = engine.advanced_search(query, with_defs=False, raw=True, limit=SEARCH_RESULTS_LIMIT)
+        except QuerySyntaxError as e:
+            bot.sendMessage(chat_id, f"No entiendo esa búsqueda: {e}")
+            return
+        if len(word_results) == SEARCH_RESULTS_LIMIT:
+            word_results = _with_remaining_results(
+                word_results, sorted(engine.advanced_search(query, with_defs=False, raw=True))
+            )
+        _send_inverse_results(engine, chat_id, word_results)
+
+
+def _with_remaining_results(ranked_results, all_results):
+    # The most relevant results go first, followed by the rest of them.
+    ranked_words = set(ranked_results)
+    return ranked_results + list(word for word in all_results if word not in ranked_words)
+
+
+def _send_inverse_results(engine, chat_id, word_results):
     if chat_id in chat_context:
         chat_context[chat_id]["/encuentra"]["last_query_result"] = word_results
     else:
@@ -57,21 +198,24 @@ def _inverse_search(chat_id, query):
     if len(word_results) == 0:
         msg = bot.sendMessage(chat_id, "No he encontrado ningún resultado.")
     else:
-        content, keyboard = _handle_inverse_results(word_results, 0)
+        content, keyboard = _handle_inverse_results(engine, word_results, 0)
         msg = bot.sendMessage(chat_id, content, parse_mode="HTML", reply_markup=keyboard)
     chat_context[chat_id]["/encuentra"]["last_message"] = message_identifier(msg)
 
 
 def _direct_search(chat_id, query):
-    bot.sendMessage(chat_id, search_engine.consult(query), parse_mode="HTML")
+    with use(_current_backend) as backend:
+        bot.sendMessage(chat_id, backend.search_engine.consult(query), parse_mode="HTML")
 
 
 def _system_statistics(chat_id, query):
-    msg = (
-        f"En el sistema hay un total de <b>{cache_manager.number_of_words()}</b> <i>palabras</i>.\n"
-        f"En el sistema hay un total de <b>{cache_manager.number_of_definitions()}</b> <i>definiciones</i>.\n"
-        f"La letra por la que <b>empiezan más palabras</b> es la <i>{cache_manager.max_words_letter()}</i>.\n"
-    )
+    with use(_current_backend) as backend:
+        cache_manager = backend.cache_manager
+        msg = (
+            f"En el sistema hay un total de <b>{cache_manager.number_of_words()}</b> <i>palabras</i>.\n"
+            f"En el sistema hay un total de <b>{cache_manager.number_of_definitions()}</b> <i>definiciones</i>.\n"
+            f"La letra por la que <b>empiezan más palabras</b> es la <i>{cache_manager.max_words_letter()}</i>.\n"
+        )
     bot.sendMessage(chat_id, msg, parse_mode="HTML")
 
 
@@ -83,13 +227,17 @@ def _show_help(chat_id, query):
         "<b><i>/encuentra</i></b>\t:\tRealiza una búsqueda inversa en todo el diccionario.\n"
         "\t<i>Ejemplo:\t/encuentra parecido marfil</i>\n"
         "\tY entre las respuestas te aparecerá <b>ebúrneo</b>.\n\n"
+        "<b><i>/avanzada</i></b>\t:\tRealiza una búsqueda inversa con operadores: OR, NOT (o -término) "
+        "y \"frases exactas\" entre comillas.\n"
+        "\t<i>Ejemplo:\t/avanzada árbol -fruto \"que tiene\"</i>\n\n"
         "<b><i>/busca</i></b>\t:\tBusca una palabra en el diccionario de forma normal, "
         "devolviéndote sus definiciones.\n"
         "\t<i>Ejemplo:\t/busca ebúrneo</i>\n\n"
         "<b><i>/definiciones</i></b>\t:\tTe responde con diversas estadisticas del sistema.\n\n"
         "<b><i>/contacto</i></b>\t:\tEnvía un mensaje a los administradores del bot para dudas o sugerencias.\n"
         "\t<i>Ejemplo:\t/contacto Muy buenas tardes.</i>\n"
-        "\tY le enviará el mensaje 'Muy buenas tardes.' a los administradores\n"
+        "\tY le enviará el mensaje 'Muy buenas tardes.' a los administradores\n\n"
+        "<b><i>/recarga</i></b>\t:\tRecarga las definiciones sin detener el bot (sólo administradores).\n"
     )
     bot.sendMessage(chat_id, msg, parse_mode="HTML")
 
@@ -103,12 +251,35 @@ def _contact_admin(chat_id, message):
     bot.sendMessage(chat_id, msg)
 
 
+def _reload_definitions(chat_id, query):
+    if chat_id not in ADMIN:
+        bot.sendMessage(chat_id, "Sólo los administradores pueden recargar las definiciones.")
+        return
+    if not reload_lock.acquire(blocking=False):
+        bot.sendMessage(chat_id, "Ya hay una recarga en curso.")
+        return
+    bot.sendMessage(chat_id, "Recargando las definiciones. El bot sigue funcionando mientras tanto.")
+    Thread(target=_reload_in_background, args=(chat_id,), daemon=True).start()
+
+
 def _init_chat(chat_id, query):
     # chat_context[chat_id] = {"/encuentra": {"last_message": None, "last_query_result": list()}}
     msg = "Bienvenido al bot!\nSi no sabes muy bien qué hacer haz <i>/ayuda</i> para ver qué puedo hacer."
     bot.sendMessage(chat_id, msg, parse_mode="HTML")
 
 
+@safe_execution(" The word is left out of the suggestions.")
+def _inline_result(engine, number, word):
+    # The headword is looked up as it is, since it can contain spaces, and its definitions must fit in a message.
+    return InlineQueryResultArticle(
+        id=str(number),
+        title=word,
+        input_message_content=InputTextMessageContent(
+            message_text=truncate_message(engine.consult_word(word)), parse_mode="HTML"
+        )
+    )
+
+
 # Chat handle functions
 @safe_execution()
 def manage_messages(input_message):
@@ -119,8 +290,10 @@ def manage_messages(input_message):
         "/ayuda": _show_help,
         "/busca": _direct_search,
         "/encuentra": _inverse_search,
+        "/avanzada": _advanced_search,
         "/estadisticas": _system_statistics,
         "/contacto": _contact_admin,
+        "/recarga": _reload_definitions,
     }
     log(f"{content_type, input_message[content_type], chat_id=}", level="INFO")
 
@@ -131,6 +304,7 @@ def manage_messages(input_message):
         command_handler.get(command, lambda *args: "No entiendo ese comando.")(chat_id, query)
     else:
         bot.sendMessage(chat_id, "Sólo admito entrada por texto.")
+    _log_first_response()
 
 
 @safe_execution()
@@ -144,12 +318,28 @@ def manage_callback(input_message):
     last_message_identifier = tuple(chat_context[chat_id]["/encuentra"]["last_message"])
 
     current_index = int(query_data[1])
-    content, keyboard = _handle_inverse_results(last_query_result, current_index)
+    with use(_current_backend) as backend:
+        content, keyboard = _handle_inverse_results(backend.search_engine, last_query_result, current_index)
     bot.editMessageText(last_message_identifier, content, parse_mode="HTML", reply_markup=keyboard)
 
 
+@safe_execution()
+def manage_inline_query(input_message):
+    query_id, _, query_string = glance(input_message, flavor="inline_query")
+    with use(_current_backend) as backend:
+        engine = backend.search_engine
+        words = engine.complete(query_string, limit=INLINE_RESULTS_LIMIT) if query_string.strip() else list()
+
+        results = list(
+            result for number, word in enumerate(words) if (result := _inline_result(engine, number, word)) is not None
+        )
+    bot.answerInlineQuery(query_id, results)
+
+
 # Main
 if __name__ == "__main__":
+    start_time = perf_counter()
+    first_response_time = None
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
 
@@ -158,13 +348,30 @@ if __name__ == "__main__":
         set_proxy(proxy)
 
     bot = Bot(token)
-    cache_manager = CacheManager()
-    search_engine = SearchEngine(cache_manager.definitions, Formatter("bot"))
+    index_ready = Event()
+    reload_lock = Lock()
+    swap_lock = Lock()
+    generations = count()
+    if USE_DATABASE or LAZY_LOADING:
+        search_backend = _build_backend()
+        index_ready.set()
+    else:
+        # Staged startup: the letter files serve the bot at once, and the index is swapped in when it is ready.
+        startup_cache_manager = CacheManager(lazy=True)
+        search_backend = SearchBackend(
+            startup_cache_manager, LazySearchEngine(startup_cache_manager.definitions, Formatter("bot")),
+            next(generations)
+        )
+        Thread(target=_warm_up_index, daemon=True).start()
 
     chat_context = load_data(BOT_CONFIG_FILE)
     current_uuid = str(uuid4())
 
-    log("Bot running...", level="INFO")
-    MessageLoop(bot, {"chat": manage_messages, "callback_query": manage_callback}).run_as_thread()
+    log(f"Bot running... (started in {perf_counter() - start_time:.2f}s)", level="INFO")
+    MessageLoop(bot, {
+        "chat": manage_messages,
+        "callback_query": manage_callback,
+        "inline_query": manage_inline_query
+    }).run_as_thread()
     while True:
         sleep(SLEEP_TIME)
@@ -1,6 +1,9 @@
 import functools
 import json
+import os
+from collections import OrderedDict
 from datetime import datetime
+from threading import Lock
 
 from code.cache_manager.API import APIException
 
@@ -15,6 +18,50 @@ class HashableDict(dict):
         return hash(tuple(sorted(self.items())))
 
 
+class LRUCache:
+    """
+    A bounded cache that evicts the least recently used entry when it is full.
+    It keeps hit and miss counters to check its effectiveness.
+    It is thread safe: the bot searches, warms up and reloads from different threads.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
 def log(message, level="LOG", end=None, start=None, show_log=True):
     """
     Logging function.
@@ -105,6 +152,21 @@ def save_data(file_to_save, object_to_serialize):
         f.write(json.dumps(object_to_serialize, indent=2, ensure_ascii=False))
 
 
+def file_is_updated(file, dependencies):
+    """
+    Args:
+        file (str): A file generated from other files.
+        dependencies (list): The files it is generated from.
+
+    Returns:
+        bool: If the file exists and it was written after the last change of all the existing dependencies.
+    """
+    if not os.path.exists(file):
+        return False
+    file_time = os.path.getmtime(file)
+    return all(file_time >= os.path.getmtime(dependency) for dependency in dependencies if os.path.exists(dependency))
+
+
 class Formatter:
     CONSOLE_INTERFACE = "console"
     BOT_INTERFACE = "bot"
@@ -145,11 +207,18 @@ class Formatter:
         self.interface = interface
         self._setup()
 
+    @staticmethod
+    def _raw_word(word, with_defs):
+        # The word, or a plain dict with its definitions whatever the type of the entry is (e.g. a corpus WordEntry).
+        if not with_defs:
+            return word['word']
+        return HashableDict({"word": word['word'], "definitions": list(word['definitions'])})
+
     @staticmethod
     def _format_word_console(word, with_defs=True, raw=False):
         # It returns the console format.
         if raw:
-            return word if with_defs else word['word']
+            return Formatter._raw_word(word, with_defs)
 
         last_length = len(word['word'])
         formatted_word = f"\n{word['word']}\n{'=' * last_length}\n"
@@ -168,7 +237,7 @@ class Formatter:
     def _format_word_bot(word, with_defs=True, raw=False):
         # It returns the bot format
         if raw:
-            return word if with_defs else word['word']
+            return Formatter._raw_word(word, with_defs)
 
         formatted_content = f"<b>{word['word']}</b>\n"
 
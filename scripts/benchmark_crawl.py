@@ -0,0 +1,133 @@
+# Crawler throughput benchmark: a full letter crawl against a local FakeServer
+import os
+import sys
+import tempfile
+from collections import Counter
+from getopt import getopt, GetoptError
+from threading import Lock
+from time import perf_counter
+
+from code.cache_manager.fake_server import FakeServer, record_from_cache
+from code.cache_manager.manager import CacheManager
+from code.config import CRAWL_RATE_LIMIT, CRAWL_WORKERS, DEFS_DIR, DEFS_FILE, WORDS_FILE
+from code.utils import load_data, save_data
+
+USAGE = "USAGE:\tpython3 scripts/benchmark_crawl.py [-l LETTER] [-n MAX_WORDS] [-w WORKERS] [-r RATE_LIMIT]\n" \
+        "\t\t[--latency SECONDS] [--jitter SECONDS] [--error-rate FRACTION] [--max-rate REQUESTS]"
+SHORT_OPTIONS = "l:n:w:r:h"
+LONG_OPTIONS = ["latency=", "jitter=", "error-rate=", "max-rate="]
+
+
+class RequestRecorder:
+    """
+    It keeps the latency, the status code and the size of every request of the APIs (see API 'on_request').
+    """
+    def __init__(self):
+        self.latencies = list()
+        self.status_codes = Counter()
+        self.retries = 0
+        self.bytes = 0
+        self._lock = Lock()
+
+    def __call__(self, url, status_code, latency, size, retry):
+        with self._lock:
+            self.latencies.append(latency)
+            self.status_codes[status_code] += 1
+            self.retries += retry
+            self.bytes += size
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def parse_options(arguments):
+    options = {
+        "letter": "Z", "max_words": None, "workers": CRAWL_WORKERS, "rate_limit": CRAWL_RATE_LIMIT,
+        "latency": 0.05, "jitter": 0.02, "error_rate": 0.01, "max_rate": None,
+    }
+    try:
+        parameters, _ = getopt(arguments[1:], SHORT_OPTIONS, LONG_OPTIONS)
+        for option, value in parameters:
+            if option == "-h":
+                print(USAGE)
+                sys.exit(0)
+            elif option == "-l":
+                options["letter"] = value.upper()
+            elif option == "-n":
+                options["max_words"] = int(value)
+            elif option == "-w":
+                options["workers"] = int(value)
+            elif option == "-r":
+                options["rate_limit"] = float(value)
+            elif option == "--max-rate":
+                options["max_rate"] = int(value)
+            else:
+                options[option[2:].replace("-", "_")] = float(value)
+    except (GetoptError, ValueError):
+        print(USAGE)
+        sys.exit(2)
+    return options
+
+
+def benchmark(letter, max_words, workers, rate_limit, latency, jitter, error_rate, max_rate):
+    """
+    It crawls all the definitions of a letter from a FakeServer that replays the cached ones, in a temporary data
+    directory, and reports the throughput of the crawl.
+
+    Returns:
+        dict: The results of the benchmark.
+    """
+    words = load_data(WORDS_FILE)[letter][:max_words]
+    definitions = load_data(f"{DEFS_DIR}/{letter}.json")
+    recordings = record_from_cache({letter: words}, {letter: definitions})
+    recorder = RequestRecorder()
+
+    working_dir = os.getcwd()
+    fake_server = FakeServer(recordings, latency=latency, jitter=jitter, error_rate=error_rate, max_rate=max_rate)
+    with fake_server, tempfile.TemporaryDirectory() as temporary_dir:
+        os.chdir(temporary_dir)
+        try:
+            os.makedirs(DEFS_DIR)
+            save_data(WORDS_FILE, {letter: words})
+            save_data(DEFS_FILE, dict())
+            cache_manager = CacheManager(
+                workers=workers, rate_limit=rate_limit, words_api_url=fake_server.words_api_url,
+                dict_api_url=fake_server.dict_api_url, on_request=recorder
+            )
+            start_time = perf_counter()
+            fetched_definitions = cache_manager._fetch_definitions_per_letter(letter, show_log=False)
+            elapsed_time = perf_counter() - start_time
+        finally:
+            os.chdir(working_dir)
+
+    return {
+        "words": len(fetched_definitions),
+        "mismatches": sum(fetched_definitions[word] != definitions.get(word, list()) for word in words),
+        "seconds": elapsed_time,
+        "words_per_second": len(fetched_definitions) / elapsed_time,
+        "requests": len(recorder.latencies),
+        "p50_latency": percentile(recorder.latencies, 0.5),
+        "p99_latency": percentile(recorder.latencies, 0.99),
+        "retries": recorder.retries,
+        "status_codes": dict(recorder.status_codes),
+        "bytes": recorder.bytes,
+    }
+
+
+if __name__ == "__main__":
+    options = parse_options(sys.argv)
+    print(f"Crawling letter {options['letter']} with {options['workers']} workers, "
+          f"{options['rate_limit'] or 'unlimited'} requests/s, {options['latency']}s (+{options['jitter']}s) of latency, "
+          f"{options['error_rate']:.0%} of errors and a server limit of {options['max_rate']} requests/s...")
+    results = benchmark(**options)
+    print(f"Words:\t\t{results['words']} ({results['mismatches']} different from the recordings)")
+    print(f"Time:\t\t{results['seconds']:.2f}s")
+    print(f"Throughput:\t{results['words_per_second']:.1f} words/s")
+    print(f"Requests:\t{results['requests']} ({results['bytes'] / 1024:.0f} KiB)")
+    print(f"Latency:\tp50 {results['p50_latency'] * 1000:.1f}ms, p99 {results['p99_latency'] * 1000:.1f}ms")
+    print(f"Retries:\t{results['retries']}")
+    print(f"Status codes:\t{results['status_codes']}")
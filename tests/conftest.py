@@ -0,0 +1,59 @@
+import os
+import sys
+
+import pytest
+
+# The repository root and the code directory are in the path, like in the scripts.
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "code"))
+sys.path.insert(0, ROOT_DIR)
+
+# A small dictionary, with accent marks, capital letters, punctuation and a word without definitions.
+DEFINITIONS = {
+    "A": {
+        "abeto": ["m. Árbol de la familia de las abietáceas, que tiene el tronco alto y derecho."],
+        "agua": [
+            "f. Sustancia líquida sin olor, color ni sabor que se encuentra en la naturaleza.",
+            "f. Lluvia.",
+        ],
+        "ababa": [],
+        "árbol": [
+            "m. Planta perenne, de tronco leñoso y elevado, que se ramifica a cierta altura del suelo.",
+            "m. Cuerpo de la hélice.",
+        ],
+        "azúcar": ["m. Sustancia cristalina, de sabor dulce, que se obtiene de la caña."],
+    },
+    "E": {
+        "eboraria": ["adj. De marfil."],
+        "ebúrneo": ["adj. De marfil.", "adj. poét. Parecido al marfil."],
+        "enebro": ["m. Arbusto de la familia de las cupresáceas, que tiene el tronco ramoso."],
+    },
+    "M": {
+        "manzano": ["m. Árbol de la familia de las rosáceas, cuyo fruto es la manzana."],
+        "mar": ["m. Masa de agua salada que cubre la mayor parte de la superficie de la Tierra."],
+        "marfil": [
+            "m. Materia dura, compacta y blanca de la que están formados los dientes de los mamíferos.",
+            "m. Color blanco que tiene el marfil.",
+        ],
+    },
+    "Z": {
+        "zapote": ["m. Árbol americano de la familia de las sapotáceas, que tiene el fruto comestible y dulce."],
+        "zumo": ["m. Líquido de las hierbas, flores o frutas, que se saca exprimiéndolas."],
+    },
+}
+
+
+@pytest.fixture(scope="session")
+def definitions():
+    # Shared by all the tests, they must not modify it.
+    return DEFINITIONS
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """
+    A working directory with an empty 'data/definiciones' directory, since the paths of the config are relative.
+    """
+    os.makedirs(tmp_path / "data" / "definiciones")
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,48 @@
+from code.bot.backend import SearchBackend, use
+
+
+class FakeEngine:
+    # A search engine that counts how many times it is closed.
+    def __init__(self):
+        self.closed = 0
+
+    def close(self):
+        self.closed += 1
+
+
+def test_retired_backend_is_closed_by_its_last_user():
+    backend = SearchBackend(None, FakeEngine())
+    assert backend.acquire()
+    assert backend.acquire()
+
+    backend.retire()
+    assert not backend.acquire()
+    backend.release()
+    assert backend.search_engine.closed == 0
+    backend.release()
+    assert backend.search_engine.closed == 1
+
+
+def test_retired_backend_without_users_is_closed_at_once():
+    backend = SearchBackend(None, FakeEngine())
+    with use(lambda: backend):
+        pass
+    assert backend.search_engine.closed == 0
+
+    backend.retire()
+    assert backend.search_engine.closed == 1
+
+
+def test_use_moves_on_to_the_swapped_backend():
+    old_backend = SearchBackend(None, FakeEngine(), generation=0)
+    new_backend = SearchBackend(None, FakeEngine(), generation=1)
+    old_backend.retire()
+    # The first read still gets the retired backend, which was swapped meanwhile.
+    backends = iter([old_backend])
+
+    with use(lambda: next(backends, new_backend)) as backend:
+        assert backend is new_backend
+        new_backend.retire()
+        assert new_backend.search_engine.closed == 0
+    assert new_backend.search_engine.closed == 1
+    assert old_backend.search_engine.closed == 1
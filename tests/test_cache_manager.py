@@ -0,0 +1,136 @@
+import os
+from urllib.parse import parse_qs, urlparse
+
+from code.cache_manager.fake_server import FakeServer, record_from_cache
+from code.cache_manager.journal import DefinitionsJournal
+from code.cache_manager.manager import CacheManager
+from code.cache_manager.statistics import StatisticsManifest
+from code.config import (
+    DEFS_DIR, DEFS_FILE, REFRESH_REPORT_FILE, STATS_FILE, TELEMETRY_FILE, TELEMETRY_SUMMARY_FILE, WORDS_FILE,
+)
+from code.utils import load_data, save_data
+
+
+class RecordingServer(FakeServer):
+    # A FakeServer that keeps the words searched in the RAE API.
+    def __init__(self, recordings):
+        super().__init__(recordings, latency=0)
+        self.searched_words = list()
+
+    def answer(self, path):
+        url = urlparse(path)
+        if url.path == "/data/search":
+            self.searched_words.append(parse_qs(url.query)["w"][0])
+        return super().answer(path)
+
+
+def _cache_manager(fake_server):
+    return CacheManager(
+        workers=2, rate_limit=0, words_api_url=fake_server.words_api_url, dict_api_url=fake_server.dict_api_url
+    )
+
+
+def test_statistics_are_updated_after_a_letter_fetch(data_dir, definitions):
+    words = {letter: list(letter_definitions) for letter, letter_definitions in definitions.items()}
+    stored_definitions = {letter: definitions[letter] for letter in ["A", "E"]}
+    save_data(WORDS_FILE, words)
+    save_data(DEFS_FILE, stored_definitions)
+    for letter, letter_definitions in stored_definitions.items():
+        save_data(f"{DEFS_DIR}/{letter}.json", letter_definitions)
+
+    with FakeServer(record_from_cache(words, definitions), latency=0) as fake_server:
+        cache_manager = _cache_manager(fake_server)
+        assert cache_manager.number_of_words() == 8
+        cache_manager._fetch_definitions_per_letter("M", show_log=False)
+
+    assert cache_manager.number_of_words("M") == 3
+    assert cache_manager.number_of_words() == 11
+    assert cache_manager.number_of_definitions() == 14
+    # The manifest is saved, so the next start does not compute it again.
+    assert StatisticsManifest.load(STATS_FILE).letters == cache_manager.statistics.letters
+
+
+def test_fetch_resumes_from_the_journal(data_dir, definitions):
+    words = list(definitions["A"])
+    save_data(WORDS_FILE, {"A": words})
+    save_data(DEFS_FILE, dict())
+
+    # A previous fetch stopped after two words, in the middle of writing the third one.
+    journal = DefinitionsJournal("A")
+    with journal:
+        journal.append("abeto", definitions["A"]["abeto"])
+        journal.append("agua", definitions["A"]["agua"])
+    with open(journal.journal_file, "a", encoding="utf-8") as file:
+        file.write('{"word": "ár')
+
+    with RecordingServer(record_from_cache({"A": words}, definitions)) as fake_server:
+        letter_definitions = _cache_manager(fake_server)._fetch_definitions_per_letter("A", show_log=False)
+
+    assert sorted(fake_server.searched_words) == sorted(["ababa", "árbol", "azúcar"])
+    # The words are stored in the order of the word list, not in the order they were fetched.
+    assert list(letter_definitions.items()) == list(definitions["A"].items())
+    assert load_data(f"{DEFS_DIR}/A.json") == definitions["A"]
+    assert not os.path.exists(journal.journal_file)
+
+
+def test_journal_discards_a_cut_line(data_dir):
+    journal = DefinitionsJournal("A")
+    with journal:
+        journal.append("abeto", ["m. Árbol."])
+    complete_size = os.path.getsize(journal.journal_file)
+    with open(journal.journal_file, "a", encoding="utf-8") as file:
+        file.write('{"word": "agua", "defin')
+
+    assert journal.load() == {"abeto": ["m. Árbol."]}
+    assert os.path.getsize(journal.journal_file) == complete_size
+
+
+def test_refresh_definitions(data_dir, definitions):
+    words = {"A": ["abeto", "agua", "azúcar", "aire"], "E": ["eboraria", "ebúrneo"]}
+    current_definitions = {
+        "A": {
+            "abeto": definitions["A"]["abeto"],
+            "agua": definitions["A"]["agua"],
+            "azúcar": definitions["A"]["azúcar"],
+            "aire": ["m. Fluido que forma la atmósfera de la Tierra."],
+        },
+        "E": {word: definitions["E"][word] for word in words["E"]},
+    }
+    # 'agua' changed, 'árbol' was removed, and 'azúcar' and 'aire' are new.
+    stored_definitions = {
+        "A": {
+            "abeto": definitions["A"]["abeto"],
+            "agua": ["f. Una definición antigua."],
+            "árbol": definitions["A"]["árbol"],
+        },
+        "E": current_definitions["E"],
+    }
+    save_data(WORDS_FILE, words)
+    save_data(DEFS_FILE, stored_definitions)
+    for letter, letter_definitions in stored_definitions.items():
+        save_data(f"{DEFS_DIR}/{letter}.json", letter_definitions)
+
+    with RecordingServer(record_from_cache(words, current_definitions)) as fake_server:
+        cache_manager = _cache_manager(fake_server)
+        report = cache_manager.refresh_definitions(sample_size=10, show_log=False)
+
+        assert report["letters"]["A"] == {"added": ["azúcar", "aire"], "removed": ["árbol"], "changed": ["agua"]}
+        assert report["letters"]["E"] == {"added": list(), "removed": list(), "changed": list()}
+        assert report["totals"] == {"added": 2, "removed": 1, "changed": 1}
+        assert load_data(f"{DEFS_DIR}/A.json") == current_definitions["A"]
+        assert list(load_data(f"{DEFS_DIR}/A.json")) == words["A"]
+        assert load_data(REFRESH_REPORT_FILE)["totals"] == report["totals"]
+        assert cache_manager.number_of_words("A") == 4
+        assert cache_manager.number_of_definitions() == 8
+
+        # The next refresh continues the sample where the previous one stopped.
+        fake_server.searched_words.clear()
+        report = cache_manager.refresh_definitions(sample_size=1, show_log=False)
+        assert report["totals"] == {"added": 0, "removed": 0, "changed": 0}
+        assert report["sample_offsets"] == {"A": 1, "E": 1}
+        assert sorted(fake_server.searched_words) == ["abeto", "eboraria"]
+
+    # The telemetry log only holds the last refresh.
+    assert set(load_data(TELEMETRY_SUMMARY_FILE)["letters"]) == {"A", "E"}
+    with open(TELEMETRY_FILE, encoding="utf-8") as file:
+        assert len(file.readlines()) == 2
@@ -0,0 +1,38 @@
+from code.search_engine.corpus import Corpus, StringTable
+
+
+def test_corpus_is_a_mapping_of_the_definitions(definitions):
+    corpus = Corpus(definitions)
+    assert list(corpus) == list(definitions)
+    for letter, letter_definitions in definitions.items():
+        assert dict(corpus[letter]) == letter_definitions
+        assert list(corpus[letter]) == list(letter_definitions)
+    assert corpus.number_of_definitions() == sum(
+        len(word_definitions)
+        for letter_definitions in definitions.values() for word_definitions in letter_definitions.values()
+    )
+
+
+def test_corpus_entries(definitions):
+    corpus = Corpus(definitions)
+    entry = corpus.entry("ebúrneo")
+    assert entry["word"] == "ebúrneo"
+    assert entry["definitions"] == definitions["E"]["ebúrneo"]
+    assert entry == corpus.entry("ebúrneo") and entry != corpus.entry("marfil")
+    assert corpus.entry("ababa")["definitions"] == list()
+    assert list(entry["word"] for entry in corpus.entries())[:3] == ["abeto", "agua", "ababa"]
+
+
+def test_corpus_keeps_the_last_definitions_of_a_repeated_word():
+    corpus = Corpus({"A": {"agua": ["f. Primera."], "aire": ["m. Aire."]}, "Á": {"agua": ["f. Última."]}})
+    # Like a single dict of all the words: the place of the first one and the definitions of the last one.
+    assert corpus.words == ["agua", "aire"]
+    assert corpus.entry("agua")["definitions"] == ["f. Última."]
+    assert corpus.number_of_definitions() == 2
+
+
+def test_string_table():
+    table = StringTable.from_strings(["árbol", "", "agua"])
+    assert len(table) == 3
+    assert list(table) == ["árbol", "", "agua"]
+    assert (table[0], table[-1], table[1:]) == ("árbol", "agua", ["", "agua"])
@@ -0,0 +1,46 @@
+import pytest
+
+from code.cache_manager.database import Database
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = Database(str(tmp_path / "diccionario.sqlite3"))
+    yield database
+    database.close()
+
+
+def test_statistics_of_an_empty_database(database):
+    assert database.number_of_words() == 0
+    assert database.number_of_definitions() == 0
+    assert database.max_words_letter() is None
+
+    # The words of the word list are not counted until their definitions are fetched.
+    database.save_words({"A": ["abeto", "agua"]})
+    assert database.number_of_words() == 0
+    assert database.max_words_letter() is None
+
+
+def test_import_data(database, definitions):
+    database.import_data({letter: list(words) for letter, words in definitions.items()}, definitions)
+
+    assert database.words() == {letter: list(words) for letter, words in definitions.items()}
+    assert database.definitions_of("ebúrneo") == definitions["E"]["ebúrneo"]
+    assert database.definitions_of("ababa") == list()
+    with pytest.raises(KeyError):
+        database.definitions_of("xyz")
+    assert database.number_of_words() == 13
+    assert database.number_of_words("E") == 3
+    assert database.number_of_definitions() == 16
+    assert database.number_of_definitions("M") == 4
+    assert database.max_words_letter() == "A"
+
+
+def test_save_letter_replaces_its_definitions(database, definitions):
+    database.import_data({letter: list(words) for letter, words in definitions.items()}, definitions)
+    database.save_letter("E", {"eboraria": ["adj. De marfil."], "ebanista": ["m. y f. Persona que trabaja en ébano."]})
+
+    assert database.number_of_words("E") == 2
+    assert database.definitions_of("ebanista") == ["m. y f. Persona que trabaja en ébano."]
+    with pytest.raises(KeyError):
+        database.definitions_of("ebúrneo")
@@ -0,0 +1,54 @@
+import pytest
+
+from code.search_engine.fuzzy import SymSpellIndex, edit_distance
+from code.utils import Formatter
+
+WORDS = [
+    "abeto", "agua", "aguacate", "árbol", "arbusto", "azúcar", "casa", "caso", "cosa", "ebúrneo", "marfil", "mar",
+    "martillo", "mármol", "extraordinario", "extraordinaria",
+]
+
+
+@pytest.mark.parametrize("source, target, distance", [
+    ("marfil", "marfil", 0),
+    ("marfil", "marfl", 1),
+    ("marfil", "mafril", 1),
+    ("casa", "cosa", 1),
+    ("casa", "cosas", 2),
+    ("agua", "aguas", 1),
+])
+def test_edit_distance(source, target, distance):
+    assert edit_distance(source, target, 3) == distance
+
+
+def test_edit_distance_stops_at_the_maximum():
+    assert edit_distance("agua", "aguacate", 2) == 3
+    assert edit_distance("abeto", "marfil", 2) == 3
+
+
+def _closest_words(query, max_distance):
+    # The words of the first distance with any word within it, comparing the query with all of them.
+    flattened_query = Formatter.flatten_text(query)
+    distances = {word: edit_distance(flattened_query, Formatter.flatten_text(word), max_distance) for word in WORDS}
+    for distance in range(1, max_distance + 1):
+        if closest_words := sorted((distances[word], word) for word in WORDS if distances[word] <= distance):
+            return list(word for _, word in closest_words)
+    return list()
+
+
+def test_lookup_matches_the_comparison_with_all_the_words():
+    index = SymSpellIndex(WORDS)
+    queries = ["arbol", "ARBOL", "marfl", "mafril", "casa", "cas", "ebrneo", "extraordinarix", "agu", "zzz", "mrmol"]
+    for query in queries:
+        assert index.lookup(query, limit=len(WORDS)) == _closest_words(query, 2), query
+
+
+def test_lookup_results():
+    index = SymSpellIndex(WORDS)
+    # Accent marks and capital letters are ignored, and a transposition is a single edit.
+    assert index.lookup("ARBOL") == ["árbol"]
+    assert index.lookup("mafril") == ["marfil"]
+    # A typo after the indexed prefix of a long word.
+    assert index.lookup("extraordinariox") == ["extraordinario"]
+    assert index.lookup("casa", limit=2) == ["casa", "caso"]
+    assert index.lookup("zzz") == list()
@@ -0,0 +1,12 @@
+from code.search_engine.index import PrefixIndex
+
+
+def test_prefix_index_complete():
+    index = PrefixIndex(["árbol", "arbusto", "Ártico", "agua", "quid pro quo", "quid divínum", "quicio", "zumo"])
+    # Accent marks and capital letters are ignored, and the words are in alphabetical order.
+    assert index.complete("AR") == ["árbol", "arbusto", "Ártico"]
+    assert index.complete("ar", limit=2) == ["árbol", "arbusto"]
+    assert index.complete("quid") == ["quid divínum", "quid pro quo"]
+    assert index.complete("quid p") == ["quid pro quo"]
+    assert index.complete("x") == list()
+    assert index.complete("", limit=4) == ["agua", "árbol", "arbusto", "Ártico"]
@@ -0,0 +1,74 @@
+import json
+import sys
+
+import pytest
+
+from code.search_engine.corpus import Corpus
+from code.search_engine.index import TokenIndex
+from code.search_engine.index_file import INDEX_FILE_MAGIC, INDEX_FILE_VERSION, PREAMBLE, IndexFileError, \
+    MappedCorpus, write_index_file
+
+
+@pytest.fixture
+def index_file(tmp_path, definitions):
+    index_file = str(tmp_path / "indice.bin")
+    write_index_file(Corpus(definitions), index_file)
+    return index_file
+
+
+def _rewrite_preamble(index_file, version=INDEX_FILE_VERSION, header=None):
+    # It replaces the version or the JSON header of the file, keeping the header length.
+    with open(index_file, "rb") as file:
+        content = file.read()
+    _, _, header_length = PREAMBLE.unpack_from(content)
+    if header is None:
+        header = content[PREAMBLE.size:PREAMBLE.size + header_length]
+    header = header.ljust(header_length)
+    with open(index_file, "wb") as file:
+        file.write(PREAMBLE.pack(INDEX_FILE_MAGIC, version, header_length) + header)
+        file.write(content[PREAMBLE.size + header_length:])
+
+
+def test_mapped_corpus_matches_the_corpus(index_file, definitions):
+    corpus = Corpus(definitions)
+    mapped_corpus = MappedCorpus(index_file)
+
+    assert list(mapped_corpus.words) == corpus.words
+    assert dict(mapped_corpus.word_ids) == corpus.word_ids
+    assert mapped_corpus.letter_ranges == corpus.letter_ranges
+    assert list(mapped_corpus.flattened_definitions()) == list(corpus.flattened_definitions())
+    for letter in definitions:
+        assert dict(mapped_corpus[letter]) == definitions[letter]
+    assert mapped_corpus.entry("ebúrneo")["definitions"] == definitions["E"]["ebúrneo"]
+    with pytest.raises(KeyError):
+        mapped_corpus.entry("xyz")
+
+    token_index = mapped_corpus.token_index(mapped_corpus.flattened_definitions())
+    expected_postings = TokenIndex(corpus.flattened_definitions()).postings
+    assert {token: list(postings) for token, postings in token_index.postings.items()} == expected_postings
+
+
+def test_index_file_of_another_version_is_rejected(index_file):
+    _rewrite_preamble(index_file, version=INDEX_FILE_VERSION - 1)
+    with pytest.raises(IndexFileError, match="version"):
+        MappedCorpus(index_file)
+
+
+def test_index_file_of_another_byte_order_is_rejected(index_file):
+    with open(index_file, "rb") as file:
+        content = file.read()
+    _, _, header_length = PREAMBLE.unpack_from(content)
+    header = json.loads(content[PREAMBLE.size:PREAMBLE.size + header_length])
+    header["byteorder"] = "big" if sys.byteorder == "little" else "little"
+    _rewrite_preamble(index_file, header=json.dumps(header).encode("utf-8"))
+
+    with pytest.raises(IndexFileError, match="endian"):
+        MappedCorpus(index_file)
+
+
+def test_other_files_are_rejected(tmp_path):
+    for name, content in [("vacio.bin", b""), ("corto.bin", b"DICINV"), ("otro.bin", b"{}" * PREAMBLE.size)]:
+        with open(tmp_path / name, "wb") as file:
+            file.write(content)
+        with pytest.raises(IndexFileError, match="not an index file"):
+            MappedCorpus(str(tmp_path / name))
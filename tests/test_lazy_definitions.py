@@ -0,0 +1,47 @@
+import pytest
+
+from code.cache_manager import lazy_definitions
+from code.cache_manager.lazy_definitions import LazyDefinitions
+from code.utils import save_data
+
+
+@pytest.fixture
+def defs_dir(tmp_path, monkeypatch, definitions):
+    for letter, letter_definitions in definitions.items():
+        save_data(str(tmp_path / f"{letter}.json"), letter_definitions)
+    monkeypatch.setattr(lazy_definitions, "DEFS_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_letters_are_loaded_on_demand(defs_dir, definitions):
+    lazy = LazyDefinitions(definitions, max_letters=2)
+    assert list(lazy) == list(definitions)
+    assert lazy.resident_letters() == 0
+
+    assert lazy["E"] == definitions["E"]
+    assert lazy.resident_letters() == 1
+    # Iterating over all the letters keeps at most 'max_letters' of them in memory.
+    assert dict(lazy.items()) == definitions
+    assert lazy.resident_letters() == 2
+    with pytest.raises(KeyError):
+        lazy["B"]
+
+
+def test_letter_that_fails_to_load_is_not_cached(defs_dir, definitions):
+    lazy = LazyDefinitions(["A", "E"])
+    with open(defs_dir / "E.json", "w", encoding="utf-8") as file:
+        file.write('{"eboraria": ')
+
+    with pytest.raises(KeyError):
+        lazy["E"]
+    assert lazy.get("E") is None
+    assert lazy.resident_letters() == 0
+
+    save_data(str(defs_dir / "E.json"), definitions["E"])
+    assert lazy["E"] == definitions["E"]
+
+
+def test_letter_of():
+    assert LazyDefinitions.letter_of("árbol") == "A"
+    assert LazyDefinitions.letter_of("Ebúrneo") == "E"
+    assert LazyDefinitions.letter_of("ñandú") == "Ñ"
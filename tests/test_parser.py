@@ -0,0 +1,36 @@
+import pytest
+
+from code.cache_manager.fake_server import record_from_cache
+from code.cache_manager.parser import parse_definitions, parse_definitions_lxml, parse_word, parse_word_lxml
+
+# Pages with other classes, nested tags, entities and paragraphs that are not definitions.
+DEFINITION_PAGES = [
+    '<p class="j"><span class="n_acep">1. </span>m. <abbr title="Botánica">Bot.</abbr> Árbol &amp; arbusto.</p>'
+    '<p class="j2"><span class="n_acep">2. </span>No es una definición.</p>'
+    '<p class="j j1"><span class="n_acep">3. </span>f. Otra <i>definición</i>.</p>',
+    '<html><body><div><p class="k j">1. Dentro de un div.</p><p>Sin clase.</p></div></body></html>',
+    "",
+]
+
+
+def test_lxml_parsers_match_beautifulsoup(definitions):
+    words = {letter: list(letter_definitions) for letter, letter_definitions in definitions.items()}
+    recordings = record_from_cache(words, definitions)
+    for page in recordings["words"].values():
+        assert parse_word_lxml(page) == parse_word(page)
+    for page in recordings["fetch"].values():
+        assert parse_definitions_lxml([page]) == parse_definitions([page])
+
+    assert parse_definitions_lxml(DEFINITION_PAGES) == parse_definitions(DEFINITION_PAGES)
+    assert parse_definitions_lxml(DEFINITION_PAGES) == [
+        "m. Bot. Árbol & arbusto.", "f. Otra definición.", "Dentro de un div.",
+    ]
+    assert parse_definitions_lxml(None) == parse_definitions(None) == list()
+
+
+def test_words_page_without_results():
+    page = "<html><body><div id='otra'><a>abeto</a></div></body></html>"
+    with pytest.raises(AttributeError):
+        parse_word(page)
+    with pytest.raises(AttributeError):
+        parse_word_lxml(page)
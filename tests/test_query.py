@@ -0,0 +1,67 @@
+import pytest
+
+from code.search_engine.query import AND, NOT, OR, PHRASE, TERM, QueryEvaluator, QuerySyntaxError, matches, \
+    parse_query, positive_terms
+
+
+@pytest.mark.parametrize("query, tree", [
+    ("", (AND, ())),
+    ("   ", (AND, ())),
+    ("marfil", (TERM, "marfil")),
+    ("Árbol, FRUTO", (AND, ((TERM, "arbol"), (TERM, "fruto")))),
+    ("arbol AND fruto", (AND, ((TERM, "arbol"), (TERM, "fruto")))),
+    ("-color", (NOT, (TERM, "color"))),
+    ("NOT color", (NOT, (TERM, "color"))),
+    ("NOT -color", (NOT, (NOT, (TERM, "color")))),
+    ('"De La" -pez', (AND, ((PHRASE, "de la"), (NOT, (TERM, "pez"))))),
+    ('"sin cerrar', (PHRASE, "sin cerrar")),
+    ("arbol OR arbusto fruto", (OR, ((TERM, "arbol"), (AND, ((TERM, "arbusto"), (TERM, "fruto")))))),
+    ("arbol | arbusto", (OR, ((TERM, "arbol"), (TERM, "arbusto")))),
+    ("(arbol | arbusto) fruto", (AND, ((OR, ((TERM, "arbol"), (TERM, "arbusto"))), (TERM, "fruto")))),
+    ("-(arbol OR arbusto)", (NOT, (OR, ((TERM, "arbol"), (TERM, "arbusto"))))),
+])
+def test_parse_query(query, tree):
+    assert parse_query(query) == tree
+
+
+@pytest.mark.parametrize("query", ["OR arbol", "arbol OR", "(arbol", "arbol)", "NOT", "arbol -)", "NOT OR arbol"])
+def test_parse_query_errors(query):
+    with pytest.raises(QuerySyntaxError):
+        parse_query(query)
+
+
+def test_positive_terms():
+    assert positive_terms(parse_query('"que tiene" (arbol | arbusto) -fruto')) == {"que tiene", "arbol", "arbusto"}
+    assert positive_terms(parse_query("")) == set()
+
+
+def test_evaluate_matches_each_definition():
+    flattened_definitions = [
+        "m. arbol de la familia de las rosaceas, cuyo fruto es la manzana.",
+        "m. arbusto de la familia de las cupresaceas, que tiene el tronco ramoso.",
+        "adj. de marfil.",
+        "m. color blanco que tiene el marfil.",
+    ]
+
+    def matching_definitions(terms):
+        return set(
+            definition_id for definition_id, definition in enumerate(flattened_definitions)
+            if all(term in definition for term in terms)
+        )
+
+    evaluator = QueryEvaluator(matching_definitions, flattened_definitions)
+    for query, expected in [
+        ("", {0, 1, 2, 3}),
+        ("marfil", {2, 3}),
+        ("marfil -color", {2}),
+        ("NOT marfil", {0, 1}),
+        ('"que tiene"', {1, 3}),
+        ('"tiene que"', set()),
+        ("(arbol | arbusto) -fruto", {1}),
+        ("-de", {3}),
+    ]:
+        tree = parse_query(query)
+        assert evaluator.evaluate(tree) == expected, query
+        assert set(
+            definition_id for definition_id, definition in enumerate(flattened_definitions) if matches(tree, definition)
+        ) == expected, query
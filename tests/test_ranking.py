@@ -0,0 +1,22 @@
+from code.search_engine.corpus import Corpus
+from code.search_engine.ranking import BM25Ranker
+
+
+def test_top_k_keeps_the_best_of_the_full_ranking(definitions):
+    corpus = Corpus(definitions)
+    flattened_definitions = corpus.flattened_definitions()
+    ranker = BM25Ranker(flattened_definitions, corpus.owners, corpus.words)
+
+    for terms in [["de"], ["de", "la"], ["que", "tiene", "el"], ["marfil"], ["a", "arbol"], [""]]:
+        definition_ids = set(
+            definition_id for definition_id, definition in enumerate(flattened_definitions)
+            if all(term in definition for term in terms)
+        )
+        term_weights = {
+            term: ranker.idf(sum(term in definition for definition in flattened_definitions)) for term in terms
+        }
+        # With room for every word, no definition is discarded.
+        ranking = ranker.top_k(definition_ids, term_weights, len(corpus.words))
+        assert len(ranking) == len(set(corpus.owners[definition_id] for definition_id in definition_ids)), terms
+        for limit in range(len(ranking) + 1):
+            assert ranker.top_k(definition_ids, term_weights, limit) == ranking[:limit], terms
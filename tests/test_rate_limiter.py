@@ -0,0 +1,31 @@
+from time import monotonic
+
+import pytest
+
+from code.cache_manager.manager import CacheManager
+from code.cache_manager.rate_limiter import TokenBucket
+
+
+def _acquire_time(bucket, requests):
+    start = monotonic()
+    for _ in range(requests):
+        bucket.acquire()
+    return monotonic() - start
+
+
+def test_burst_up_to_the_capacity():
+    assert _acquire_time(TokenBucket(1, capacity=5), 5) < 0.5
+
+
+def test_requests_are_throttled_to_the_rate():
+    # After the burst of one second of tokens, the rest of the requests wait for theirs.
+    bucket = TokenBucket(50)
+    assert 0.18 <= _acquire_time(bucket, 60) < 1
+
+
+def test_rate_must_be_positive():
+    with pytest.raises(Exception):
+        TokenBucket(0)
+    # 0 disables the limit of the crawl, but it can not be negative.
+    with pytest.raises(Exception):
+        CacheManager(rate_limit=-1)
@@ -0,0 +1,234 @@
+import json
+import re
+
+import pytest
+
+from code.cache_manager import lazy_definitions
+from code.cache_manager.database import Database
+from code.cache_manager.lazy_definitions import LazyDefinitions
+from code.search_engine.corpus import Corpus
+from code.search_engine.index_file import write_index_file
+from code.search_engine.lazy_search_engine import LazySearchEngine
+from code.search_engine.query import QuerySyntaxError
+from code.search_engine.search_engine import SearchEngine
+from code.search_engine.sqlite_search_engine import SQLiteSearchEngine
+from code.utils import save_data
+
+# The engines compared with the scan mode: the ones over the definitions in memory, the one over an index file, and
+# the one that loads the letters on demand.
+MEMORY_MODES = ["index", "trigram", "buffer", "parallel"]
+MODES = MEMORY_MODES + ["mapped", "lazy"]
+# The SQLite engine ranks with its own BM25, so it is not compared ranked.
+ALL_MODES = MODES + ["sqlite"]
+
+QUERIES = ["marfil", "arbol", "de la familia", "que tiene", "fruto dulce", "Árbol, tronco", "agua", "xyz", "a"]
+# The terms are matched as substrings of the definitions, even inside a word or across two of them.
+SUBSTRING_QUERIES = ["rfi", "olor", "ar", "o de", "de l"]
+PATTERNS = [r"^adj\.", r"marfil\.$", r"\bde la\b", r"tronco (alto|leñoso)"]
+ADVANCED_QUERIES = [
+    "marfil -color", "arbol OR arbusto", '"que tiene" -fruto', "(arbol | arbusto) familia", "-de", '"de marfil"', "",
+]
+
+
+@pytest.fixture(scope="module")
+def engines(tmp_path_factory, definitions):
+    data_dir = tmp_path_factory.mktemp("data")
+    database = Database(str(data_dir / "diccionario.sqlite3"))
+    database.import_data({letter: list(words) for letter, words in definitions.items()}, definitions)
+
+    index_file = str(data_dir / "indice.bin")
+    write_index_file(Corpus(definitions), index_file)
+
+    for letter, letter_definitions in definitions.items():
+        save_data(str(data_dir / f"{letter}.json"), letter_definitions)
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(lazy_definitions, "DEFS_DIR", str(data_dir))
+        engines = {mode: SearchEngine(definitions, mode=mode, workers=2) for mode in ["scan"] + MEMORY_MODES}
+        engines["mapped"] = SearchEngine.from_index_file(index_file)
+        engines["lazy"] = LazySearchEngine(LazyDefinitions(definitions, max_letters=2))
+        engines["sqlite"] = SQLiteSearchEngine(database)
+        yield engines
+        for engine in engines.values():
+            engine.close()
+
+
+def _words(results):
+    return sorted(results)
+
+
+@pytest.mark.parametrize("mode", ALL_MODES)
+def test_search_matches_scan(engines, mode):
+    for query in QUERIES:
+        expected = engines["scan"].search(query, raw=True)
+        assert _words(engines[mode].search(query, raw=True)) == _words(expected), query
+
+
+@pytest.mark.parametrize("mode", ALL_MODES)
+def test_substring_search_matches_scan(engines, mode):
+    for query in SUBSTRING_QUERIES:
+        expected = engines["scan"].search(query, raw=True, sep=",")
+        assert _words(engines[mode].search(query, raw=True, sep=",")) == _words(expected), query
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_ranked_search_matches_scan(engines, mode):
+    for query in QUERIES:
+        assert engines[mode].search(query, raw=True, limit=3) == engines["scan"].search(query, raw=True, limit=3), query
+
+
+@pytest.mark.parametrize("mode", ALL_MODES)
+def test_search_iter_and_pages_match_scan(engines, mode):
+    for query in QUERIES:
+        expected = list(engines["scan"].search_iter(query, raw=True))
+        assert list(engines[mode].search_iter(query, raw=True)) == expected, query
+        pages = list(engines[mode].search_page(query, offset, 2, raw=True) for offset in range(0, len(expected), 2))
+        assert sum(pages, list()) == expected, query
+
+
+def test_search_iter_and_pages_order(engines):
+    engine = engines["index"]
+    # The results come in the dictionary order.
+    assert list(engine.search_iter("de la", raw=True)) == [
+        "abeto", "árbol", "azúcar", "enebro", "manzano", "mar", "marfil", "zapote", "zumo",
+    ]
+    assert next(engine.search_iter("de la", raw=True)) == "abeto"
+    assert engine.search_page("de la", 7, 5, raw=True) == ["zapote", "zumo"]
+    assert engine.search_page("de la", 20, 5, raw=True) == list()
+
+
+@pytest.mark.parametrize("mode", ALL_MODES)
+def test_advanced_search_matches_scan(engines, mode):
+    for query in ADVANCED_QUERIES:
+        expected = engines["scan"].advanced_search(query, raw=True)
+        assert _words(engines[mode].advanced_search(query, raw=True)) == _words(expected), query
+        if mode != "sqlite":
+            expected = engines["scan"].advanced_search(query, raw=True, limit=3)
+            assert engines[mode].advanced_search(query, raw=True, limit=3) == expected, query
+
+
+@pytest.mark.parametrize("mode", ALL_MODES)
+def test_search_pattern_matches_scan(engines, mode):
+    for pattern in PATTERNS:
+        expected = engines["scan"].search_pattern(pattern, raw=True)
+        assert _words(engines[mode].search_pattern(pattern, raw=True)) == _words(expected), pattern
+
+
+@pytest.mark.parametrize("mode", ["scan"] + ALL_MODES)
+def test_search_many_matches_search(engines, mode):
+    engine = engines[mode]
+    queries = QUERIES + ["marfil", ""]
+    batch_results = engine.search_many(queries, raw=True)
+    assert len(batch_results) == len(queries)
+    for query, results in zip(queries, batch_results):
+        assert _words(results) == _words(engines["scan"].search(query, raw=True)), query
+
+
+def test_search_results(engines):
+    engine = engines["index"]
+    assert _words(engine.search("marfil", raw=True)) == ["eboraria", "ebúrneo", "marfil"]
+    # Accent marks, capital letters and commas are ignored.
+    assert _words(engine.search("ÁRBOL,  familia", raw=True)) == ["abeto", "manzano", "zapote"]
+    assert engine.search("xyz", raw=True) == list()
+    # The word without definitions is never a result.
+    assert "ababa" not in engine.search("", raw=True)
+
+
+def test_ranked_search_results(engines):
+    engine = engines["index"]
+    # The definitions of 'eboraria' and 'ebúrneo' tie, so they are ordered alphabetically.
+    assert engine.search("marfil", raw=True, limit=2) == ["eboraria", "ebúrneo"]
+    assert engine.search("marfil", raw=True, limit=10) == ["eboraria", "ebúrneo", "marfil"]
+    assert engine.search("marfil", raw=True, limit=0) == list()
+
+
+@pytest.mark.parametrize("mode", ["scan"] + ALL_MODES)
+def test_consult(engines, mode):
+    engine = engines[mode]
+    assert "marfil" in engine.consult("ebúrneo")
+    assert engine.consult("eburneo") == "No encuentro esa palabra. ¿Quisiste decir ebúrneo?"
+    assert engine.consult("xyz") == "No encuentro esa palabra."
+
+
+def test_raw_results_with_definitions_are_plain_dicts(engines, definitions):
+    engine = engines["index"]
+    expected = [
+        {"word": "eboraria", "definitions": definitions["E"]["eboraria"]},
+        {"word": "ebúrneo", "definitions": definitions["E"]["ebúrneo"]},
+    ]
+    for results in [
+        engines["sqlite"].search("de marfil", raw=True, with_defs=True),
+        engine.search("de marfil", raw=True, with_defs=True),
+        engine.search("de marfil", raw=True, with_defs=True, limit=5),
+        list(engine.search_iter("de marfil", raw=True, with_defs=True)),
+        engine.search_page("de marfil", 0, 5, raw=True, with_defs=True),
+        engine.advanced_search('"de marfil"', raw=True, with_defs=True),
+    ]:
+        assert all(isinstance(result, dict) for result in results)
+        assert json.loads(json.dumps(sorted(results, key=lambda result: result["word"]))) == expected
+
+
+def test_sqlite_ranked_search(engines):
+    # The best results of the SQLite BM25 are among the results of the search.
+    for query in QUERIES:
+        results = engines["sqlite"].search(query, raw=True, limit=3)
+        assert len(results) == min(3, len(engines["scan"].search(query, raw=True))), query
+        assert set(results) <= set(engines["scan"].search(query, raw=True)), query
+
+
+def test_advanced_search_results(engines):
+    engine = engines["index"]
+    # A single definition must match the whole query, and the one of 'marfil' with the term also has 'color'.
+    assert _words(engine.advanced_search("marfil -color", raw=True)) == ["eboraria", "ebúrneo"]
+    assert _words(engine.advanced_search('"de marfil"', raw=True)) == ["eboraria", "ebúrneo"]
+    assert _words(engine.advanced_search("NOT de", raw=True)) == ["agua", "ebúrneo", "marfil"]
+    with pytest.raises(QuerySyntaxError):
+        engine.advanced_search("(marfil", raw=True)
+
+
+def test_search_cache_keys_of_each_search(engines):
+    engine = engines["index"]
+    engine.cache.clear()
+    # The same text is a different query in the simple and in the advanced search.
+    assert _words(engine.search("marfil -color", raw=True)) == list()
+    assert _words(engine.advanced_search("marfil -color", raw=True)) == ["eboraria", "ebúrneo"]
+
+
+def test_search_pattern_results(engines):
+    engine = engines["buffer"]
+    # ^ and $ match the beginning and the end of each definition, that is flattened.
+    assert _words(engine.search_pattern(r"^adj\.", raw=True)) == ["eboraria", "ebúrneo"]
+    assert _words(engine.search_pattern(r"marfil\.$", raw=True)) == ["eboraria", "ebúrneo", "marfil"]
+    assert _words(engine.search_pattern(r"^m\. arbol", raw=True)) == ["abeto", "manzano", "zapote"]
+    with pytest.raises(re.error):
+        engine.search_pattern("(", raw=True)
+
+
+def test_similar(engines, definitions):
+    engine = engines["index"]
+    # No definition has both terms literally, but the ones of 'marfil' are close.
+    assert engine.search("dientes blancos", raw=True) == list()
+    assert engine.similar("dientes blancos", raw=True) == ["marfil"]
+    assert engine.similar("árbol con fruto", limit=2, raw=True) == ["manzano", "zapote"]
+    assert engine.similar("líquido", raw=True, with_defs=True) == [
+        {"word": "zumo", "definitions": definitions["Z"]["zumo"]},
+    ]
+    assert engine.similar("xyz", raw=True) == list()
+
+
+def test_complete(engines):
+    engine = engines["index"]
+    assert engine.complete("MAR") == ["mar", "marfil"]
+    assert engine.complete("ar") == ["árbol"]
+    assert engine.complete("e", limit=2) == ["eboraria", "ebúrneo"]
+    assert engine.complete("x") == list()
+
+
+def test_search_cache_is_emptied_when_the_definitions_change(definitions):
+    engine = SearchEngine(definitions)
+    assert engine.search("marfil", raw=True) == engine.search("marfil", raw=True)
+    assert engine.cache.hits == 1
+
+    engine.set_definitions({"M": {"marfil": definitions["M"]["marfil"]}})
+    assert len(engine.cache) == 0
+    assert engine.search("marfil", raw=True) == ["marfil"]
@@ -0,0 +1,52 @@
+import re
+from math import log, sqrt
+
+from code.search_engine.corpus import Corpus
+from code.search_engine.similarity import TfIdfSimilarity
+from code.utils import Formatter
+
+QUERIES = ["dientes blancos", "árbol con fruto", "líquido", "sustancia de sabor dulce", "de", "xyz"]
+
+
+def _word_similarities(corpus, query):
+    # The best cosine similarity of the definitions of each word, computed definition by definition.
+    flattened_definitions = list(corpus.flattened_definitions())
+    tokens = list(re.findall(r"\w+", definition) for definition in flattened_definitions)
+    document_frequencies = dict()
+    for definition_tokens in tokens:
+        for token in set(definition_tokens):
+            document_frequencies[token] = document_frequencies.get(token, 0) + 1
+    idf = {token: log((1 + len(tokens)) / (1 + frequency)) + 1 for token, frequency in document_frequencies.items()}
+
+    def normalized(vector):
+        norm = sqrt(sum(value * value for value in vector.values()))
+        return {token: value / norm for token, value in vector.items()} if norm else vector
+
+    query_vector = dict()
+    for token in re.findall(r"\w+", Formatter.flatten_text(query)):
+        if token in idf:
+            query_vector[token] = query_vector.get(token, 0) + idf[token]
+    query_vector = normalized(query_vector)
+
+    similarities = dict()
+    for definition_id, definition_tokens in enumerate(tokens):
+        vector = normalized({
+            token: (1 + log(definition_tokens.count(token))) * idf[token] for token in set(definition_tokens)
+        })
+        similarity = sum(value * vector.get(token, 0) for token, value in query_vector.items())
+        word_id = corpus.owners[definition_id]
+        similarities[word_id] = max(similarities.get(word_id, 0), similarity)
+    return similarities
+
+
+def test_top_k_ranks_by_cosine_similarity(definitions):
+    corpus = Corpus(definitions)
+    similarity = TfIdfSimilarity(corpus.flattened_definitions(), corpus.word_offsets)
+    for query in QUERIES:
+        similarities = _word_similarities(corpus, query)
+        word_ids = similarity.top_k(query, len(corpus.words))
+        # Only the words with some similarity, from the most to the least similar.
+        assert sorted(word_ids) == sorted(word_id for word_id, value in similarities.items() if value > 1e-6), query
+        scores = list(similarities[word_id] for word_id in word_ids)
+        assert all(score >= next_score - 1e-6 for score, next_score in zip(scores, scores[1:])), query
+        assert similarity.top_k(query, 2) == word_ids[:2], query
@@ -0,0 +1,43 @@
+from code.cache_manager.statistics import StatisticsManifest
+
+
+def test_statistics_from_definitions(definitions):
+    statistics = StatisticsManifest.from_definitions(definitions)
+    assert statistics.number_of_words() == 13
+    assert statistics.number_of_definitions() == 16
+    assert statistics.number_of_words("A") == 5
+    assert statistics.number_of_definitions("E") == 4
+    assert statistics.max_words_letter() == "A"
+    # The definition lengths are counted in words, grouped in buckets of LENGTH_BUCKET words.
+    assert statistics.definition_lengths("Z") == {"10": 1, "15": 1}
+    assert sum(statistics.definition_lengths().values()) == 16
+
+
+def test_update_letter(definitions):
+    statistics = StatisticsManifest.from_definitions(definitions)
+    statistics.update_letter("E", {"eboraria": ["adj. De marfil."]})
+    assert statistics.number_of_words("E") == 1
+    assert statistics.definition_lengths("E") == {"0": 1}
+    assert statistics.number_of_words() == 11
+    assert statistics.number_of_definitions() == 13
+
+    statistics.update_letter("B", {f"b{number}": ["m. Palabra."] for number in range(6)})
+    assert statistics.max_words_letter() == "B"
+
+
+def test_save_and_load(tmp_path, definitions):
+    statistics = StatisticsManifest.from_definitions(definitions)
+    manifest_file = str(tmp_path / "estadisticas.json")
+    statistics.save(manifest_file)
+
+    loaded_statistics = StatisticsManifest.load(manifest_file)
+    assert loaded_statistics.letters == statistics.letters
+    assert loaded_statistics.totals == statistics.totals
+    assert loaded_statistics.top_letters == statistics.top_letters
+
+
+def test_empty_statistics():
+    statistics = StatisticsManifest()
+    assert statistics.number_of_words() == 0
+    assert statistics.definition_lengths() == dict()
+    assert statistics.max_words_letter() is None
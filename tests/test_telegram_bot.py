@@ -0,0 +1,74 @@
+import pytest
+
+from code import telegram_bot
+from code.bot.backend import SearchBackend
+from code.bot.bot_utils import MESSAGE_MAX_LENGTH, truncate_message
+from code.search_engine.search_engine import SearchEngine
+from code.utils import Formatter
+
+
+class FakeBot:
+    # It keeps the inline answers instead of sending them.
+    def __init__(self):
+        self.inline_answers = list()
+
+    def answerInlineQuery(self, query_id, results):
+        self.inline_answers.append((query_id, results))
+
+
+@pytest.fixture
+def fake_bot(monkeypatch):
+    definitions = {
+        "H": {"hacer": list(f"tr. Acepción número {number} del verbo hacer." for number in range(200))},
+        "Q": {
+            "quicio": ["m. Parte de las puertas o ventanas en que entra el espigón del quicial."],
+            "quid divínum": ["m. Inspiración propia del genio."],
+            "quid pro quo": ["m. Cosa que se sustituye por algo equivalente."],
+        },
+    }
+    fake_bot = FakeBot()
+    monkeypatch.setattr(telegram_bot, "bot", fake_bot, raising=False)
+    backend = SearchBackend(None, SearchEngine(definitions, Formatter("bot")))
+    monkeypatch.setattr(telegram_bot, "search_backend", backend, raising=False)
+    return fake_bot
+
+
+def _inline_query(query):
+    return {"id": "1", "from": {"id": 2}, "query": query}
+
+
+def test_inline_query_suggests_headwords_with_spaces(fake_bot):
+    telegram_bot.manage_inline_query(_inline_query("quid"))
+
+    (query_id, results), = fake_bot.inline_answers
+    assert query_id == "1"
+    assert list(result.title for result in results) == ["quid divínum", "quid pro quo"]
+    assert results[0].input_message_content.message_text == (
+        "<b>quid divínum</b>\n<i>1.\tm. Inspiración propia del genio.</i>\n"
+    )
+
+
+def test_inline_query_fits_long_entries_in_a_message(fake_bot):
+    telegram_bot.manage_inline_query(_inline_query("hac"))
+
+    (_, results), = fake_bot.inline_answers
+    message_text = results[0].input_message_content.message_text
+    assert len(message_text) <= MESSAGE_MAX_LENGTH
+    assert message_text.startswith("<b>hacer</b>\n<i>1.\t")
+    # It is cut after a whole definition.
+    assert message_text.endswith("</i>\n…")
+
+
+def test_inline_query_leaves_out_the_words_that_fail(fake_bot, monkeypatch):
+    engine = telegram_bot.search_backend.search_engine
+    monkeypatch.setattr(engine, "complete", lambda prefix, limit: ["quicio", "quidam", "quid pro quo"])
+    telegram_bot.manage_inline_query(_inline_query("qui"))
+
+    (_, results), = fake_bot.inline_answers
+    assert list(result.title for result in results) == ["quicio", "quid pro quo"]
+
+
+def test_truncate_message():
+    assert truncate_message("<b>a</b>\n<i>1.\tb</i>\n", max_length=21) == "<b>a</b>\n<i>1.\tb</i>\n"
+    assert truncate_message("<b>a</b>\n<i>1.\tbbbbbbbbb</i>\n", max_length=20) == "<b>a</b>\n…"
+    assert truncate_message("a" * 30, max_length=20) == "a" * 19 + "…"
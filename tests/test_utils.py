@@ -0,0 +1,20 @@
+from code.utils import LRUCache
+
+
+def test_lru_cache_evicts_the_least_recently_used():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_lru_cache_of_size_0_keeps_nothing():
+    cache = LRUCache(0)
+    cache.put("a", 1)
+    assert len(cache) == 0